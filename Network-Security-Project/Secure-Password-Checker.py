@@ -124,22 +124,27 @@ def evaluate_password(password):
 
 # ---------------- MAIN PROGRAM ---------------- #
 
-print("="*50)
-print("Welcome to the Password Strength Checker")
-print("="*50)
-
-while True:
-    pwd = input("\nEnter a password to test: ")
-    problems, rating = evaluate_password(pwd)
-
-    print("\n Your password:", pwd)
-    print("Strength rating:", rating)
-
-    if not problems and rating == "Strong":
-        print("Great! Your password is strong.")
-        break
-    else:
-        print("\nSuggestions to improve:")
-        for prob in problems:
-            print(textwrap.fill(" - " + prob, width=70))
-        print("\nPlease try again...")
+def main():
+    print("="*50)
+    print("Welcome to the Password Strength Checker")
+    print("="*50)
+
+    while True:
+        pwd = input("\nEnter a password to test: ")
+        problems, rating = evaluate_password(pwd)
+
+        print("\n Your password:", pwd)
+        print("Strength rating:", rating)
+
+        if not problems and rating == "Strong":
+            print("Great! Your password is strong.")
+            break
+        else:
+            print("\nSuggestions to improve:")
+            for prob in problems:
+                print(textwrap.fill(" - " + prob, width=70))
+            print("\nPlease try again...")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,12 @@ You can save login credentials, private notes, and bank/card info securely.
 """
 
 import os
-import json
+import tempfile
 from cryptography.fernet import Fernet
 
+import metrics
+from vault_store import VaultStore, VaultError
+
 
 # ------------------- Key Management -------------------
 
@@ -15,37 +18,49 @@ DATA_FILE = "secure_data.json"  # File to store encrypted data
 
 def get_encryption_key():
     """Get the encryption key. Make a new one if it doesn't exist."""
-    if os.path.exists(KEY_FILE):
-        with open(KEY_FILE, "rb") as f:
-            key = f.read()  # Read key from file
-    else:
-        key = Fernet.generate_key()  # Create a new key
-        with open(KEY_FILE, "wb") as f:
-            f.write(key)  # Save key for later
-    return key
+    if not os.path.exists(KEY_FILE):
+        # Write the new key to a temp file first, then link it into place. The link fails
+        # if another program got there first, and KEY_FILE is never seen half-written.
+        folder = os.path.dirname(os.path.abspath(KEY_FILE))
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".secret_key_")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(Fernet.generate_key())  # Create a new key
+                f.flush()
+                os.fsync(f.fileno())
+            os.link(tmp_path, KEY_FILE)  # Save key for later
+        except FileExistsError:
+            pass  # Another program created the key at the same moment; use theirs
+        finally:
+            os.unlink(tmp_path)
+    with open(KEY_FILE, "rb") as f:
+        return f.read()  # Read key from file
 
 cipher = Fernet(get_encryption_key())  # Create a Fernet object to encrypt/decrypt
+vault = VaultStore(DATA_FILE, cipher)  # Locked, atomic access to the data file
 
 
 # ------------------- Data Handling -------------------
 
+@metrics.timed("secure_storage_load", "Secure_Storage.load_secure_data()")
 def load_secure_data():
-    """Load saved data from file, or start with an empty dictionary if none exists."""
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "rb") as f:
-            encrypted = f.read()  # Read encrypted data
-        try:
-            decrypted = cipher.decrypt(encrypted).decode()  # Decrypt it
-            return json.loads(decrypted)  # Convert JSON string to dict
-        except:
-            return {}  # If error, return empty dict
-    return {}  # If file doesn't exist, return empty dict
+    """
+    Load a snapshot of the saved data, or an empty dictionary if nothing is saved yet.
+    Raises VaultCorruptedError if the file can't be decrypted, instead of hiding it.
+    """
+    return vault.snapshot()
 
+@metrics.timed("secure_storage_save", "Secure_Storage vault saves")
 def save_secure_data():
-    """Encrypt the data and save it to a file."""
-    encrypted = cipher.encrypt(json.dumps(stored_data).encode())
-    with open(DATA_FILE, "wb") as f:
-        f.write(encrypted)
+    """Encrypt the entries in stored_data and merge them into the saved file."""
+    vault.update(stored_data)
+
+
+@metrics.timed("secure_storage_save", "Secure_Storage vault saves")
+def save_secure_entry(name, info):
+    """Save one entry without touching entries other programs may have saved meanwhile."""
+    stored_data[name] = info
+    vault.put(name, info)
 
 
 # ------------------- User Actions -------------------
@@ -62,27 +77,28 @@ def add_secure_entry():
         site = input("Website/Service Name: ")
         username = input("Username: ")
         password = input("Password: ")
-        stored_data[site] = {"type": "credentials", "username": username, "password": password}
+        name, info = site, {"type": "credentials", "username": username, "password": password}
     elif choice == "2":
         note_title = input("Note Title: ")
         content = input("Note Content: ")
-        stored_data[note_title] = {"type": "note", "content": content}
+        name, info = note_title, {"type": "note", "content": content}
     elif choice == "3":
         bank_name = input("Bank/Card Name: ")
         number = input("Card Number: ")
         expiry = input("Expiry Date: ")
         cvv = input("CVV: ")
-        stored_data[bank_name] = {"type": "bank_info", "number": number, "expiry": expiry, "cvv": cvv}
+        name, info = bank_name, {"type": "bank_info", "number": number, "expiry": expiry, "cvv": cvv}
     else:
         print("Invalid choice!")
         return
 
-    save_secure_data()  # Save changes after adding
+    save_secure_entry(name, info)  # Save the new entry
     print("Entry saved safely!")
 
 
 def display_entries():
     """Show all saved entries in a readable way."""
+    stored_data.update(load_secure_data())  # Pick up entries saved by other programs
     if not stored_data:
         print("No entries stored yet.")
         return
@@ -106,21 +122,31 @@ def display_entries():
 
 # ------------------- Main Menu Loop -------------------
 
-stored_data = load_secure_data()  # Load saved data at start
-
-while True:
-    print("\n=== Secure Storage Menu ===")
-    print("1. Add Entry")
-    print("2. View Entries")
-    print("3. Exit")
-    menu_choice = input("Enter choice: ").strip()
-
-    if menu_choice == "1":
-        add_secure_entry()  # Let user add a new entry
-    elif menu_choice == "2":
-        display_entries()  # Show all entries
-    elif menu_choice == "3":
-        print("Exiting... Stay safe!")
-        break
-    else:
-        print("Invalid choice. Please try again.")
\ No newline at end of file
+try:
+    stored_data = load_secure_data()  # Load saved data at start
+except VaultError as e:
+    # Never start over with an empty vault: the next save would wipe the real one
+    raise SystemExit(f"Cannot open the secure storage: {e}")
+
+
+def main():
+    while True:
+        print("\n=== Secure Storage Menu ===")
+        print("1. Add Entry")
+        print("2. View Entries")
+        print("3. Exit")
+        menu_choice = input("Enter choice: ").strip()
+
+        if menu_choice == "1":
+            add_secure_entry()  # Let user add a new entry
+        elif menu_choice == "2":
+            display_entries()  # Show all entries
+        elif menu_choice == "3":
+            print("Exiting... Stay safe!")
+            break
+        else:
+            print("Invalid choice. Please try again.")
+
+
+if __name__ == "__main__":
+    main()
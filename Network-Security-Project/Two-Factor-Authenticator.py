@@ -135,48 +135,53 @@ def generate_otp():
 
 # ------------------- MAIN PROGRAM -------------------
 
-print("="*50)
-print("Welcome to Secure Password & 2FA System")
-print("="*50)
-
-# Ask user to create a password
-while True:
-    password = input("\nEnter a password to register: ")
-    issues, rating = check_password_strength(password)
-
-    print("\nPassword:", password)
-    print("Strength rating:", rating)
-
-    if not issues and rating == "Strong":
-        print("Strong password! Proceeding to 2FA...")
-        break
-    else:
-        print("\nIssues to fix:")
-        for issue in issues:
-            print(textwrap.fill(" - " + issue, width=70))
-        print("Please try again...")
-
-
-# Hash the password
-hashed_pw = hash_password(password)
-print("\nYour password has been hashed for safe storage:")
-print(hashed_pw)
-
-# Generate a 6-digit OTP
-otp = generate_otp()
-print("\nA one-time verification code has been sent to your device:")
-print(otp)
-
-# Verify OTP 
-attempts = 3
-while attempts > 0:
-    entered = input("\nEnter the 6-digit code: ")
-    if entered == otp:
-        print("2FA verified. Login successful!")
-        break
-    else:
-        attempts -= 1
-        print(f"Incorrect code. Attempts left: {attempts}")
-
-if attempts == 0:
-    print("Too many failed attempts. Access denied.")
+def main():
+    print("="*50)
+    print("Welcome to Secure Password & 2FA System")
+    print("="*50)
+
+    # Ask user to create a password
+    while True:
+        password = input("\nEnter a password to register: ")
+        issues, rating = check_password_strength(password)
+
+        print("\nPassword:", password)
+        print("Strength rating:", rating)
+
+        if not issues and rating == "Strong":
+            print("Strong password! Proceeding to 2FA...")
+            break
+        else:
+            print("\nIssues to fix:")
+            for issue in issues:
+                print(textwrap.fill(" - " + issue, width=70))
+            print("Please try again...")
+
+
+    # Hash the password
+    hashed_pw = hash_password(password)
+    print("\nYour password has been hashed for safe storage:")
+    print(hashed_pw)
+
+    # Generate a 6-digit OTP
+    otp = generate_otp()
+    print("\nA one-time verification code has been sent to your device:")
+    print(otp)
+
+    # Verify OTP 
+    attempts = 3
+    while attempts > 0:
+        entered = input("\nEnter the 6-digit code: ")
+        if entered == otp:
+            print("2FA verified. Login successful!")
+            break
+        else:
+            attempts -= 1
+            print(f"Incorrect code. Attempts left: {attempts}")
+
+    if attempts == 0:
+        print("Too many failed attempts. Access denied.")
+
+
+if __name__ == "__main__":
+    main()
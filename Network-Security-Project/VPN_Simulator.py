@@ -1,9 +1,14 @@
 """
 This program simulates a basic VPN/proxy connection demo.  
 It shows your real IP address and allows you to “connect” to fake VPN IPs from different countries.
+The fastest server is chosen automatically by probing the latency of every server.
 """
 
-import requests
+import os
+
+from geoip import GEOIP_DB, GeoIPDatabase
+from public_ip import PublicIPError, get_public_ip
+from vpn_server_probe import ServerSelector
 
 
 # ------------------- Fake VPN IPs -------------------
@@ -22,12 +27,19 @@ vpn_servers = {
 # ------------------- Get Real IP -------------------
 
 def fetch_real_ip():
-    """Get your real public IP address using an API."""
-    try:
-        resp = requests.get("https://api.ipify.org?format=json", timeout=5)
-        return resp.json().get("ip")
-    except Exception as e:
-        return f"Error: {e}"
+    """
+    Get your real public IP address by racing several lookup services.
+    The answer is cached for a short time. Raises PublicIPError on failure.
+    """
+    return get_public_ip()
+
+
+def ip_country(ip):
+    """Look up the country of an IP in the compiled GeoIP database (None if unavailable)."""
+    if not os.path.exists(GEOIP_DB):
+        return None
+    with GeoIPDatabase(GEOIP_DB) as db:
+        return db.lookup(ip)
 
 
 # ------------------- VPN Demo -------------------
@@ -37,10 +49,41 @@ def vpn_demo():
     print("Simple VPN/Proxy Demo")
 
     # Display real IP
-    real_ip = fetch_real_ip()
-    print(f"Your Real IP: {real_ip}\n")
-
-    # Show list of available VPN locations
+    try:
+        real_ip = fetch_real_ip()
+        country = ip_country(real_ip)
+        location = f" ({country})" if country else ""
+        print(f"Your Real IP: {real_ip}{location}\n")
+    except PublicIPError as e:
+        print(f"Could not get your real IP: {e}\n")
+
+    # Probe every server and pick the best one automatically
+    print("Measuring latency to all VPN servers...")
+    selector = ServerSelector(vpn_servers)
+    selector.probe()
+    for server in selector.ranking():
+        if server.latency is None:
+            print(f"  {server.name}: unreachable")
+        else:
+            print(f"  {server.name}: {server.latency:.1f} ms "
+                  f"(jitter {server.jitter:.1f} ms, loss {server.loss:.0%})")
+
+    best = selector.best()
+    if best is None:
+        print("\nNo server answered. Please pick one manually.")
+        country = choose_server_manually()
+        if country is None:
+            return
+    else:
+        country = best.name
+
+    fake_ip = vpn_servers[country]
+    print(f"\nConnecting to VPN server in {country}...")
+    print(f"Your new (simulated) IP: {fake_ip}")
+
+
+def choose_server_manually():
+    """Let the user pick a country from the menu. Returns None on a bad choice."""
     print("Choose a VPN server location:")
     for idx, country in enumerate(vpn_servers.keys(), start=1):
         print(f"{idx}. {country}")
@@ -50,14 +93,12 @@ def vpn_demo():
 
     try:
         choice = int(choice)
-        country = list(vpn_servers.keys())[choice - 1]
-        fake_ip = vpn_servers[country]
-
-        print(f"\nConnecting to VPN server in {country}...")
-        print(f"Your new (simulated) IP: {fake_ip}")
-
+        if choice < 1:
+            raise IndexError
+        return list(vpn_servers.keys())[choice - 1]
     except (ValueError, IndexError):
         print("Invalid choice. Please enter a valid number.")
+        return None
 
 
 # ------------------- Run Program -------------------
@@ -0,0 +1,398 @@
+"""
+This program measures the hot paths of the other programs in this project from one place.
+It times password checking, bcrypt hashing, Fernet encryption, the encrypted vault and
+TLS certificate checks, writes the results as JSON, and can compare two result files to
+flag anything that got slower than a chosen threshold.
+
+Usage:
+  python benchmarks.py run [--output results.json] [--only NAME] [--repeat N]
+  python benchmarks.py compare OLD.json NEW.json [--threshold 10]
+"""
+
+import io
+import os
+import ssl
+import sys
+import json
+import socket
+import timeit
+import argparse
+import platform
+import tempfile
+import datetime
+import threading
+import statistics
+import contextlib
+import importlib
+import importlib.util
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+
+# ------------------- SETTINGS -------------------
+
+DEFAULT_REPEAT = 5         # timing rounds per benchmark
+DEFAULT_THRESHOLD = 10.0   # percent slowdown that counts as a regression
+SAMPLE_PASSWORD = "Tr0ub4dor&3-horse!"
+
+
+# ------------------- Helpers -------------------
+
+def load_script(filename: str, name: str):
+    """Import one of the project's scripts by file name (some have '-' in their names)."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def quiet(func):
+    """Wrap a function so anything it prints is thrown away."""
+    def run(*args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func(*args, **kwargs)
+    return run
+
+
+def make_self_signed_cert(folder: str):
+    """Create a throwaway certificate for 'localhost' and return (cert_path, key_path)."""
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    import ipaddress
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=30))
+            .add_extension(x509.SubjectAlternativeName([
+                x509.DNSName("localhost"),
+                x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .sign(key, hashes.SHA256()))
+
+    cert_path = os.path.join(folder, "cert.pem")
+    key_path = os.path.join(folder, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM,
+                                  serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+def start_tls_server(cert_path: str, key_path: str):
+    """Start a local TLS server that completes handshakes. Returns (listener, port)."""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def handle(conn):
+        try:
+            with context.wrap_socket(conn, server_side=True) as tls:
+                tls.recv(1)
+        except OSError:
+            pass
+
+    def serve():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener, listener.getsockname()[1]
+
+
+# ------------------- Benchmarks -------------------
+#
+# Each benchmark is a setup function that returns (operation, cleanup).
+# The operation is what gets timed; cleanup (or None) runs afterwards.
+
+def bench_evaluate_password():
+    checker = load_script("Secure-Password-Checker.py", "password_checker")
+    return lambda: checker.evaluate_password(SAMPLE_PASSWORD), None
+
+
+def bench_check_password_strength():
+    two_factor = load_script("Two-Factor-Authenticator.py", "two_factor")
+    return lambda: two_factor.check_password_strength(SAMPLE_PASSWORD), None
+
+
+def bench_login_system_hashpw():
+    import login_system
+    bcrypt = login_system.bcrypt
+    password = SAMPLE_PASSWORD.encode()
+    # Same call as login_system.register()
+    return lambda: bcrypt.hashpw(password, bcrypt.gensalt()), None
+
+
+def bench_login_system_checkpw():
+    import login_system
+    bcrypt = login_system.bcrypt
+    password = SAMPLE_PASSWORD.encode()
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt())
+    # Same call as login_system.login()
+    return lambda: bcrypt.checkpw(password, hashed), None
+
+
+def bench_brute_force_login():
+    """Every login records an audit event; send those to a temporary folder."""
+    import audit_log
+    with contextlib.redirect_stdout(io.StringIO()):
+        import brute_force_protection
+    login = quiet(brute_force_protection.login)
+    folder = tempfile.mkdtemp(prefix="bench_audit_")
+    old_log = audit_log._default_log
+    audit_log._default_log = audit_log.AuditLog(folder).start()
+
+    def cleanup():
+        audit_log._default_log.close()
+        audit_log._default_log = old_log
+        for name in os.listdir(folder):
+            os.remove(os.path.join(folder, name))
+        os.rmdir(folder)
+    return lambda: login("alice", "mypassword"), cleanup
+
+
+def bench_basic_cryptography_roundtrip():
+    import basic_cryptography
+    cipher = basic_cryptography.create_cipher()
+    message = "meet me at the usual place " * 4
+
+    def roundtrip():
+        token = basic_cryptography.encrypt_message(cipher, message)
+        return basic_cryptography.decrypt_message(cipher, token)
+    return roundtrip, None
+
+
+def bench_encrypted_chat_roundtrip():
+    from cryptography.fernet import Fernet
+    import encrypted_chat
+    cipher = Fernet(Fernet.generate_key())
+    message = "hello from user1, how are you today?"
+    return lambda: encrypted_chat.decrypt_text(encrypted_chat.encrypt_text(message, cipher), cipher), None
+
+
+def _secure_storage(entries: int = 100):
+    """Import Secure_Storage inside a temporary folder so its key and vault files land there."""
+    folder = tempfile.mkdtemp(prefix="bench_vault_")
+    old_cwd = os.getcwd()
+    os.chdir(folder)
+    try:
+        sys.modules.pop("Secure_Storage", None)
+        storage = importlib.import_module("Secure_Storage")
+    finally:
+        os.chdir(old_cwd)
+    storage.KEY_FILE = os.path.join(folder, "secret.key")
+    storage.DATA_FILE = os.path.join(folder, "secure_data.json")
+    storage.stored_data.clear()
+    for i in range(entries):
+        storage.stored_data[f"site{i}"] = {"type": "credentials", "username": f"user{i}",
+                                          "password": SAMPLE_PASSWORD}
+
+    def cleanup():
+        for name in os.listdir(folder):
+            os.remove(os.path.join(folder, name))
+        os.rmdir(folder)
+    return storage, cleanup
+
+
+def bench_secure_storage_save():
+    storage, cleanup = _secure_storage()
+    return storage.save_secure_data, cleanup
+
+
+def bench_secure_storage_save_entry():
+    storage, cleanup = _secure_storage()
+    storage.save_secure_data()
+    return lambda: storage.save_secure_entry("site0", storage.stored_data["site0"]), cleanup
+
+
+def bench_secure_storage_load():
+    """Cold load: the vault's decrypted copy is dropped first, so every call decrypts."""
+    storage, cleanup = _secure_storage()
+    storage.save_secure_data()
+
+    def load():
+        storage.vault.invalidate()
+        return storage.load_secure_data()
+    return load, cleanup
+
+
+def bench_secure_storage_load_cached():
+    storage, cleanup = _secure_storage()
+    storage.save_secure_data()
+    return storage.load_secure_data, cleanup
+
+
+def bench_verify_url_security():
+    import network_transport_security as nts
+    folder = tempfile.mkdtemp(prefix="bench_tls_")
+    cert_path, key_path = make_self_signed_cert(folder)
+    listener, port = start_tls_server(cert_path, key_path)
+    # A checker with both TTLs at zero does a full DNS + TCP + TLS check every time
+    checker = nts.TLSChecker(dns_ttl=0, cert_ttl=0,
+                             context=ssl.create_default_context(cafile=cert_path))
+    url = f"https://localhost:{port}/"
+
+    def check():
+        status = nts.verify_url_security(url, checker)
+        if not status.startswith("Secure"):
+            raise RuntimeError(status)
+
+    def cleanup():
+        listener.close()
+        for path in (cert_path, key_path):
+            os.remove(path)
+        os.rmdir(folder)
+    return check, cleanup
+
+
+BENCHMARKS = {
+    "password_checker.evaluate_password": bench_evaluate_password,
+    "two_factor.check_password_strength": bench_check_password_strength,
+    "login_system.hashpw": bench_login_system_hashpw,
+    "login_system.checkpw": bench_login_system_checkpw,
+    "brute_force_protection.login": bench_brute_force_login,
+    "basic_cryptography.fernet_roundtrip": bench_basic_cryptography_roundtrip,
+    "encrypted_chat.fernet_roundtrip": bench_encrypted_chat_roundtrip,
+    "secure_storage.save_secure_data": bench_secure_storage_save,
+    "secure_storage.save_secure_entry": bench_secure_storage_save_entry,
+    "secure_storage.load_secure_data": bench_secure_storage_load,
+    "secure_storage.load_secure_data_cached": bench_secure_storage_load_cached,
+    "network_transport_security.verify_url_security": bench_verify_url_security,
+}
+
+
+# ------------------- Running -------------------
+
+def time_operation(operation, repeat: int = DEFAULT_REPEAT) -> dict:
+    """
+    Time an operation. The loop count is picked automatically (about 0.2 s per
+    round), then `repeat` rounds are run. Times are per call, in microseconds.
+    """
+    timer = timeit.Timer(operation)
+    number, _ = timer.autorange()
+    rounds = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "median_us": statistics.median(rounds),
+        "min_us": min(rounds),
+        "mean_us": statistics.fmean(rounds),
+        "stdev_us": statistics.stdev(rounds) if len(rounds) > 1 else 0.0,
+        "loops": number,
+        "rounds": repeat,
+    }
+
+
+def run_benchmarks(only=None, repeat: int = DEFAULT_REPEAT) -> dict:
+    """Run the chosen benchmarks (all by default) and return the JSON-ready report."""
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if only and not any(part in name for part in only):
+            continue
+        operation, cleanup = setup()
+        try:
+            results[name] = time_operation(operation, repeat)
+        finally:
+            if cleanup:
+                cleanup()
+        print(f"{name:<50} {results[name]['median_us']:>14.2f} us", file=sys.stderr)
+
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare_reports(old: dict, new: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Compare the medians of two reports. Returns rows of
+    (name, old_us, new_us, change_percent, status) where status is
+    "regression", "improvement", "ok", "new" or "missing".
+    """
+    rows = []
+    old_results, new_results = old["results"], new["results"]
+    for name in sorted(set(old_results) | set(new_results)):
+        if name not in new_results:
+            rows.append((name, old_results[name]["median_us"], None, None, "missing"))
+            continue
+        if name not in old_results:
+            rows.append((name, None, new_results[name]["median_us"], None, "new"))
+            continue
+        before = old_results[name]["median_us"]
+        after = new_results[name]["median_us"]
+        change = (after - before) / before * 100
+        if change > threshold:
+            status = "regression"
+        elif change < -threshold:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append((name, before, after, change, status))
+    return rows
+
+
+# ------------------- Main -------------------
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the project's hot paths.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = commands.add_parser("run", help="run the benchmarks and write JSON results")
+    run_cmd.add_argument("--output", "-o", help="file to write (default: standard output)")
+    run_cmd.add_argument("--only", action="append",
+                         help="only run benchmarks whose name contains this text")
+    run_cmd.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+
+    compare_cmd = commands.add_parser("compare", help="compare two result files")
+    compare_cmd.add_argument("old")
+    compare_cmd.add_argument("new")
+    compare_cmd.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                             help="percent slowdown that counts as a regression")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run_benchmarks(args.only, args.repeat)
+        text = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return 0
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    rows = compare_reports(old, new, args.threshold)
+    for name, before, after, change, status in rows:
+        before_text = f"{before:.2f}" if before is not None else "-"
+        after_text = f"{after:.2f}" if after is not None else "-"
+        change_text = f"{change:+.1f}%" if change is not None else ""
+        print(f"{name:<50} {before_text:>12} {after_text:>12} {change_text:>9}  {status}")
+    regressions = [row for row in rows if row[4] == "regression"]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0f}%.")
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
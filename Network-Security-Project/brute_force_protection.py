@@ -8,6 +8,9 @@ It also includes a lockout mechanism after multiple failed login attempts.
 import bcrypt
 import time
 
+import metrics
+import audit_log
+
 # ------------------- USERS DATABASE -------------------
 # Example in-memory user database: username -> hashed password
 users_db = {
@@ -20,7 +23,13 @@ login_attempts = {}
 LOCK_DURATION = 30  # seconds to lock account after too many failed attempts
 MAX_TRIES = 3       # number of allowed failed attempts
 
+lockouts = metrics.counter("brute_force_lockouts_total", "Accounts locked after too many failures")
+locked_attempts = metrics.counter("brute_force_locked_attempts_total",
+                                  "Login attempts rejected because the account was locked")
+
 # ------------------- LOGIN FUNCTION -------------------
+@metrics.timed("brute_force_login", "brute_force_protection.login()",
+               outcome=lambda ok: "success" if ok else "failure")
 def login(username, password):
     current_time = time.time()
 
@@ -32,20 +41,29 @@ def login(username, password):
     if login_attempts[username]["lock_until"] > current_time:
         wait = int(login_attempts[username]["lock_until"] - current_time)
         print(f"Account locked. Try again in {wait} seconds.")
+        locked_attempts.inc()
+        audit_log.record("login_rejected_locked", source="brute_force_protection",
+                         user=username, retry_in=wait)
         return False
 
     # Verify password
     if username in users_db and bcrypt.checkpw(password.encode(), users_db[username]):
         print("Login successful!")
         login_attempts[username] = {"count": 0, "lock_until": 0.0}  # reset failed attempts
+        audit_log.record("login_success", source="brute_force_protection", user=username)
         return True
     else:
         # Failed attempt
         login_attempts[username]["count"] += 1
         if login_attempts[username]["count"] >= MAX_TRIES:
             login_attempts[username]["lock_until"] = current_time + LOCK_DURATION
+            lockouts.inc()
+            audit_log.record("account_locked", source="brute_force_protection", user=username,
+                             attempts=login_attempts[username]["count"], duration=LOCK_DURATION)
             print(f"Too many failed attempts. Account locked for {LOCK_DURATION} seconds.")
         else:
+            audit_log.record("login_failed", source="brute_force_protection", user=username,
+                             attempts=login_attempts[username]["count"])
             print("Wrong password. Try again.")
         return False
 
@@ -0,0 +1,364 @@
+"""
+This program keeps watching the SSL certificates of many hosts instead of checking them by hand.
+Hosts wait in a priority queue ordered by when they are next due. Certificates that are close
+to expiry (or whose checks keep failing) are rescanned often, healthy ones only now and then.
+The schedule is saved to disk so the monitor can be restarted, and alerts fire when a
+certificate crosses an expiry threshold or a host stops answering.
+"""
+
+import os
+import ssl
+import sys
+import json
+import time
+import heapq
+import random
+import tempfile
+from datetime import timezone
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from cryptography import x509
+
+from network_transport_security import (CONNECT_TIMEOUT, DEFAULT_PORT, fetch_certificate,
+                                        happy_eyeballs_connect, resolve_host)
+
+
+# ------------------- SETTINGS -------------------
+
+STATE_FILE = "cert_monitor_state.json"   # where the schedule is saved between runs
+
+DAY = 86400
+MIN_INTERVAL = 3600           # never rescan a healthy host more often than hourly
+MAX_INTERVAL = 7 * DAY        # never wait more than a week between scans
+RESCAN_FRACTION = 0.1         # wait about 10% of the remaining certificate lifetime
+RETRY_INTERVAL = 300          # first retry after a failed scan (doubles each time)
+FAILURE_ALERT_AFTER = 3       # failed scans in a row before a failure alert
+ALERT_THRESHOLDS = (30, 14, 7, 3, 1, 0)   # days before expiry that trigger an alert
+MAX_WORKERS = 32              # scans running at the same time
+
+X509_V_ERR_CERT_HAS_EXPIRED = 10   # OpenSSL verify code; expiry has its own alerts
+
+
+# ------------------- Helpers -------------------
+
+def split_host(target: str):
+    """Turn 'example.com' or 'example.com:8443' into (host, port)."""
+    parsed = urlparse("//" + target)
+    return parsed.hostname, parsed.port or DEFAULT_PORT
+
+
+def read_expiry_unverified(host: str, port: int, addresses=None,
+                           timeout: float = CONNECT_TIMEOUT) -> float:
+    """
+    Fetch the certificate without checking it and return its expiry as a Unix timestamp.
+    Used for certificates the normal check rejects (expired, self-signed, untrusted),
+    so their expiry is still known.
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    raw = happy_eyeballs_connect(addresses or resolve_host(host, port), timeout)
+    with context.wrap_socket(raw, server_hostname=host) as conn:
+        der = conn.getpeercert(binary_form=True)
+    cert = x509.load_der_x509_certificate(der)
+    not_after = getattr(cert, "not_valid_after_utc", None)   # cryptography 42+
+    if not_after is None:
+        not_after = cert.not_valid_after.replace(tzinfo=timezone.utc)
+    return not_after.timestamp()
+
+
+def scan_certificate(target: str):
+    """
+    Connect to the host and return (expiry as a Unix timestamp, trust problem or None).
+    If the certificate fails verification it is read again without checking, so an
+    expired or untrusted certificate still reports its expiry instead of a failed scan.
+    """
+    host, port = split_host(target)
+    addresses = resolve_host(host, port)
+    try:
+        cert = fetch_certificate(host, port, addresses=addresses)
+        return ssl.cert_time_to_seconds(cert["notAfter"]), None
+    except ssl.SSLCertVerificationError as e:
+        problem = e.verify_message or str(e)
+        if e.verify_code == X509_V_ERR_CERT_HAS_EXPIRED:
+            problem = None   # an expired certificate is reported by the expiry thresholds
+    return read_expiry_unverified(host, port, addresses), problem
+
+
+def print_alert(target: str, message: str):
+    """Default alert handler: just print the alert."""
+    print(f"[ALERT] {target}: {message}")
+
+
+def next_interval(days_left: float, failures: int) -> float:
+    """
+    Decide how long to wait before scanning a host again.
+    Failing hosts are retried quickly, and healthy hosts wait longer the
+    further their certificate is from expiry.
+    """
+    if failures:
+        return min(RETRY_INTERVAL * 2 ** (failures - 1), MIN_INTERVAL)
+
+    interval = days_left * DAY * RESCAN_FRACTION
+    interval = max(MIN_INTERVAL, min(MAX_INTERVAL, interval))
+
+    # Do not sleep past the next alert threshold
+    for threshold in ALERT_THRESHOLDS:
+        until_threshold = (days_left - threshold) * DAY
+        if until_threshold > 0:
+            interval = min(interval, max(MIN_INTERVAL, until_threshold))
+    return interval
+
+
+# ------------------- Monitor -------------------
+
+class CertificateMonitor:
+    """
+    Schedules certificate scans for a fleet of hosts.
+    Each host has a state entry (expiry, failures, next due time, last alert,
+    trust problem) and a heap of (next_due, host) decides which one is scanned next.
+    `scan(target)` returns (expiry timestamp, trust problem or None).
+    """
+
+    def __init__(self, state_file: str = STATE_FILE, scan=scan_certificate, alert=print_alert,
+                 clock=time.time, max_workers: int = MAX_WORKERS):
+        self.state_file = state_file
+        self.scan = scan
+        self.alert = alert
+        self.clock = clock
+        self.max_workers = max_workers
+        self.hosts = {}    # target -> state dict
+        self._queue = []   # heap of (next_due, target)
+        self.scans = 0
+        if state_file and os.path.exists(state_file):
+            self.load()
+
+    # ---- Fleet management ----
+
+    def add_host(self, target: str):
+        """Start monitoring a host (it is scanned as soon as possible)."""
+        if target in self.hosts:
+            return
+        self.hosts[target] = {
+            "not_after": None,
+            "failures": 0,
+            "next_due": self.clock(),
+            "alert_level": None,
+            "last_error": None,
+            "verify_error": None,
+        }
+        heapq.heappush(self._queue, (self.hosts[target]["next_due"], target))
+
+    def remove_host(self, target: str):
+        """Stop monitoring a host. Its old queue entry is skipped later."""
+        self.hosts.pop(target, None)
+
+    # ---- Persistence ----
+
+    def save(self):
+        """Write the state to disk atomically so a crash never leaves half a file."""
+        if not self.state_file:
+            return
+        folder = os.path.dirname(os.path.abspath(self.state_file))
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".cert_monitor_")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.hosts, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.state_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load(self):
+        """Read the saved state and rebuild the queue from it."""
+        with open(self.state_file) as f:
+            self.hosts = json.load(f)
+        self._queue = [(state["next_due"], target) for target, state in self.hosts.items()]
+        heapq.heapify(self._queue)
+
+    # ---- Scanning ----
+
+    def _pop_due(self, now: float) -> list:
+        """Take every host that is due from the queue."""
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            next_due, target = heapq.heappop(self._queue)
+            state = self.hosts.get(target)
+            # Skip removed hosts and stale entries left behind by rescheduling
+            if state is None or state["next_due"] != next_due:
+                continue
+            due.append(target)
+        return due
+
+    def _scan_one(self, target: str):
+        """Run one scan and return (expiry, trust problem, error)."""
+        try:
+            not_after, problem = self.scan(target)
+            return not_after, problem, None
+        except Exception as e:
+            return None, None, str(e) or type(e).__name__
+
+    def _record(self, target: str, not_after, problem, error, now: float):
+        """Update a host's state after a scan, fire alerts and reschedule it."""
+        state = self.hosts.get(target)
+        if state is None:
+            return
+
+        if error is not None:
+            state["failures"] += 1
+            state["last_error"] = error
+            if state["failures"] == FAILURE_ALERT_AFTER:
+                self.alert(target, f"scan failed {FAILURE_ALERT_AFTER} times in a row ({error})")
+            days_left = (state["not_after"] - now) / DAY if state["not_after"] else 0
+        else:
+            if state["failures"] >= FAILURE_ALERT_AFTER:
+                self.alert(target, "host is reachable again")
+            state["failures"] = 0
+            state["last_error"] = None
+            state["not_after"] = not_after
+            days_left = (not_after - now) / DAY
+            self._check_thresholds(target, state, days_left)
+            self._check_trust(target, state, problem)
+
+        state["next_due"] = now + next_interval(days_left, state["failures"])
+        heapq.heappush(self._queue, (state["next_due"], target))
+
+    def _check_thresholds(self, target: str, state: dict, days_left: float):
+        """Alert once each time the certificate drops below a new threshold."""
+        crossed = [t for t in ALERT_THRESHOLDS if days_left <= t]
+        level = min(crossed) if crossed else None
+
+        if level is None:
+            state["alert_level"] = None   # renewed (or still far away): reset
+            return
+        if state["alert_level"] is None or level < state["alert_level"]:
+            state["alert_level"] = level
+            if days_left <= 0:
+                self.alert(target, "certificate has expired")
+            else:
+                self.alert(target, f"certificate expires in {days_left:.1f} days")
+
+    def _check_trust(self, target: str, state: dict, problem):
+        """Alert when a certificate stops passing verification, and when it is fixed."""
+        previous = state.get("verify_error")
+        state["verify_error"] = problem
+        if problem and problem != previous:
+            self.alert(target, f"certificate is not trusted ({problem})")
+        elif previous and not problem:
+            self.alert(target, "certificate is trusted again")
+
+    def run_pending(self, now: float = None) -> int:
+        """Scan every host that is due now. Returns how many scans were made."""
+        now = self.clock() if now is None else now
+        due = self._pop_due(now)
+        if not due:
+            return 0
+
+        if self.max_workers > 1 and len(due) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(due))) as pool:
+                results = list(pool.map(self._scan_one, due))
+        else:
+            results = [self._scan_one(target) for target in due]
+
+        for target, (not_after, problem, error) in zip(due, results):
+            self._record(target, not_after, problem, error, now)
+        self.scans += len(due)
+        return len(due)
+
+    def seconds_until_next(self) -> float:
+        """How long until the next host is due (0 if one is already due)."""
+        while self._queue:
+            next_due, target = self._queue[0]
+            state = self.hosts.get(target)
+            if state is None or state["next_due"] != next_due:
+                heapq.heappop(self._queue)
+                continue
+            return max(0.0, next_due - self.clock())
+        return MAX_INTERVAL
+
+    def run_forever(self, poll_limit: float = 60):
+        """Keep scanning due hosts, saving the state after every batch."""
+        while True:
+            if self.run_pending():
+                self.save()
+            time.sleep(min(self.seconds_until_next(), poll_limit))
+
+
+# ------------------- Fleet Simulation -------------------
+
+def simulate_fleet(host_count: int = 50000, days: int = 30, sweep_interval: float = MIN_INTERVAL,
+                   seed: int = 1) -> dict:
+    """
+    Simulate monitoring a fleet on a fake clock and count the connections used.
+    Certificates expire at random within 13 months, some get renewed when they
+    come close to expiry, and a few hosts are unreachable. The result is
+    compared with a fixed sweep that scans every host every `sweep_interval`.
+    """
+    rng = random.Random(seed)
+    start = 1_700_000_000.0
+    clock = [start]
+    expiry = {f"host{i}.example": start + rng.uniform(1, 398) * DAY for i in range(host_count)}
+    broken = set(rng.sample(sorted(expiry), host_count // 100))
+
+    def fake_scan(target):
+        if target in broken:
+            raise ConnectionError("connection refused")
+        days_left = (expiry[target] - clock[0]) / DAY
+        if days_left < 20 and rng.random() < 0.5:
+            expiry[target] = clock[0] + 90 * DAY   # the owner renewed it
+        return expiry[target], None
+
+    alerts = []
+    monitor = CertificateMonitor(state_file=None, scan=fake_scan,
+                                 alert=lambda t, m: alerts.append((t, m)),
+                                 clock=lambda: clock[0], max_workers=1)
+    for target in expiry:
+        monitor.add_host(target)
+
+    end = start + days * DAY
+    while True:
+        clock[0] = clock[0] + monitor.seconds_until_next()
+        if clock[0] > end:
+            break
+        monitor.run_pending()
+
+    sweep_scans = host_count * int(days * DAY // sweep_interval)
+    return {
+        "hosts": host_count,
+        "days": days,
+        "adaptive_scans": monitor.scans,
+        "sweep_scans": sweep_scans,
+        "ratio": monitor.scans / sweep_scans,
+        "alerts": len(alerts),
+    }
+
+
+# ------------------- Main -------------------
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--simulate":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+        report = simulate_fleet(count)
+        print(f"Hosts: {report['hosts']} over {report['days']} days")
+        print(f"Adaptive monitor scans: {report['adaptive_scans']}")
+        print(f"Fixed hourly sweep scans: {report['sweep_scans']}")
+        print(f"Connections used: {report['ratio']:.2%} of the fixed sweep")
+        print(f"Alerts raised: {report['alerts']}")
+    elif len(sys.argv) > 1 or os.path.exists(STATE_FILE):
+        # New hosts are added to the saved schedule (if there is one)
+        monitor = CertificateMonitor()
+        for target in sys.argv[1:]:
+            monitor.add_host(target)
+        monitor.save()
+        print(f"Monitoring {len(monitor.hosts)} host(s). Press Ctrl+C to stop.")
+        try:
+            monitor.run_forever()
+        except KeyboardInterrupt:
+            monitor.save()
+            print("\nMonitor stopped. State saved.")
+    else:
+        print("Usage: python certificate_monitor.py HOST[:PORT] ...")
+        print("       python certificate_monitor.py --simulate [HOST_COUNT]")
@@ -0,0 +1,397 @@
+"""
+This program finds which country an IP address belongs to.
+A CSV of IP ranges is compiled once into a compact binary file of sorted arrays.
+The file is opened with mmap (so even millions of ranges load instantly) and
+searched with bisect, which takes only a few microseconds per lookup.
+It can also tag every line of an IP log with the country of the IP it contains.
+"""
+
+import os
+import re
+import sys
+import csv
+import mmap
+import time
+import array
+import random
+import socket
+import struct
+import bisect
+import tempfile
+import ipaddress
+
+
+# ------------------- File Format -------------------
+#
+# header:     magic, byte order of the arrays, IPv4 range count, IPv6 range count,
+#             country-name block size
+# countries:  country names separated by "\n" (padded to 8 bytes)
+# IPv4:       starts (uint32), ends (uint32), country index (uint16)
+# IPv6:       starts and ends split into high/low uint64 halves, country index (uint16)
+#
+# The arrays are always stored little-endian, so a file compiled on one machine
+# works on any other. Little-endian machines (almost all of them) use the arrays
+# straight from the mmap; big-endian ones load byte-swapped copies.
+
+MAGIC = b"NSGEOIP2"
+BYTE_ORDER = b"little"
+HEADER = struct.Struct("<8s8sQQQ")
+GEOIP_DB = "geoip.db"   # default compiled database
+LOW_64 = (1 << 64) - 1
+
+
+def _pad(size: int) -> int:
+    """Round a section size up to 8 bytes so every array stays aligned."""
+    return (size + 7) & ~7
+
+
+# ------------------- Compiling -------------------
+
+def parse_range(row: list):
+    """
+    Read one CSV row: either "start_ip,end_ip,country" or "network/prefix,country".
+    Returns (version, start, end, country).
+    """
+    if len(row) >= 3:
+        start = ipaddress.ip_address(row[0].strip())
+        end = ipaddress.ip_address(row[1].strip())
+        country = row[2].strip()
+    elif len(row) == 2:
+        network = ipaddress.ip_network(row[0].strip(), strict=False)
+        start, end = network.network_address, network.broadcast_address
+        country = row[1].strip()
+    else:
+        raise ValueError(f"expected 2 or 3 columns, got {len(row)}")
+    if start.version != end.version or int(start) > int(end):
+        raise ValueError(f"bad range {start} - {end}")
+    return start.version, int(start), int(end), country
+
+
+def _little_endian(values: array.array) -> bytes:
+    """Return the array's bytes in little-endian order, whatever this machine uses."""
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def compile_csv(csv_path: str, db_path: str = GEOIP_DB) -> dict:
+    """
+    Compile a CSV of IP ranges into the binary lookup file.
+    Ranges may be in any order but must not overlap. Lines starting with "#"
+    and rows that do not start with an IP (like a header row) are skipped.
+    """
+    ranges = {4: [], 6: []}
+    countries = {}
+    with open(csv_path, newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith("#"):
+                continue
+            try:
+                version, start, end, country = parse_range(row)
+            except ValueError:
+                if not ranges[4] and not ranges[6]:
+                    continue   # header row
+                raise
+            index = countries.setdefault(country, len(countries))
+            ranges[version].append((start, end, index))
+
+    if len(countries) > 0xFFFF:
+        raise ValueError("too many different countries (limit is 65535)")
+    for version in (4, 6):
+        ranges[version].sort()
+        for (_, prev_end, _), (start, _, _) in zip(ranges[version], ranges[version][1:]):
+            if start <= prev_end:
+                raise ValueError(f"overlapping IPv{version} ranges near {ipaddress.ip_address(start)}")
+
+    names = "\n".join(countries).encode()
+    with open(db_path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, BYTE_ORDER, len(ranges[4]), len(ranges[6]), len(names)))
+        out.write(names.ljust(_pad(len(names)), b"\0"))
+
+        v4 = ranges[4]
+        for values, code in (([r[0] for r in v4], "I"), ([r[1] for r in v4], "I"),
+                             ([r[2] for r in v4], "H")):
+            data = _little_endian(array.array(code, values))
+            out.write(data.ljust(_pad(len(data)), b"\0"))
+
+        v6 = ranges[6]
+        for values, code in (([r[0] >> 64 for r in v6], "Q"), ([r[0] & LOW_64 for r in v6], "Q"),
+                             ([r[1] >> 64 for r in v6], "Q"), ([r[1] & LOW_64 for r in v6], "Q"),
+                             ([r[2] for r in v6], "H")):
+            data = _little_endian(array.array(code, values))
+            out.write(data.ljust(_pad(len(data)), b"\0"))
+
+    return {"ipv4_ranges": len(ranges[4]), "ipv6_ranges": len(ranges[6]),
+            "countries": len(countries)}
+
+
+# ------------------- Lookup -------------------
+
+class GeoIPDatabase:
+    """
+    A compiled range table opened with mmap.
+    Nothing is copied into Python objects when the file is opened, so loading
+    takes the same (tiny) time no matter how many ranges the file holds.
+    """
+
+    def __init__(self, db_path: str = GEOIP_DB):
+        with open(db_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, order, v4_count, v6_count, names_size = HEADER.unpack_from(view)
+        if magic != MAGIC or order.rstrip(b"\0") != BYTE_ORDER:
+            view.release()
+            self._mmap.close()
+            raise ValueError(f"{db_path} is not a compiled GeoIP database (or is an old format)")
+
+        offset = HEADER.size
+        self.countries = bytes(view[offset:offset + names_size]).decode().split("\n")
+        offset += _pad(names_size)
+
+        self._views = [view]   # released on close()
+
+        def section(count, code):
+            nonlocal offset
+            size = count * array.array(code).itemsize
+            part = view[offset:offset + size]
+            offset += _pad(size)
+            if sys.byteorder == "big":
+                values = array.array(code, part.tobytes())
+                values.byteswap()
+                part.release()
+                return values
+            part = part.cast(code)
+            self._views.append(part)
+            return part
+
+        self._v4_starts = section(v4_count, "I")
+        self._v4_ends = section(v4_count, "I")
+        self._v4_country = section(v4_count, "H")
+        self._v6_start_hi = section(v6_count, "Q")
+        self._v6_start_lo = section(v6_count, "Q")
+        self._v6_end_hi = section(v6_count, "Q")
+        self._v6_end_lo = section(v6_count, "Q")
+        self._v6_country = section(v6_count, "H")
+
+    def lookup_ipv4(self, value: int):
+        """Return the country for an IPv4 address given as an integer (or None)."""
+        i = bisect.bisect_right(self._v4_starts, value) - 1
+        if i >= 0 and value <= self._v4_ends[i]:
+            return self.countries[self._v4_country[i]]
+        return None
+
+    def lookup_ipv6(self, value: int):
+        """Return the country for an IPv6 address given as an integer (or None)."""
+        high, low = value >> 64, value & LOW_64
+        # Find the ranges sharing the high half, then search the low half among them
+        last = bisect.bisect_right(self._v6_start_hi, high)
+        first = bisect.bisect_left(self._v6_start_hi, high, 0, last)
+        i = bisect.bisect_right(self._v6_start_lo, low, first, last) - 1
+        if i >= 0 and (high, low) <= (self._v6_end_hi[i], self._v6_end_lo[i]):
+            return self.countries[self._v6_country[i]]
+        return None
+
+    def lookup(self, ip: str):
+        """Return the country for an IP address string, or None if it is not in any range."""
+        try:
+            return self.lookup_ipv4(int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big"))
+        except OSError:
+            pass
+        try:
+            packed = socket.inet_pton(socket.AF_INET6, ip)
+        except OSError:
+            raise ValueError(f"not an IP address: {ip!r}") from None
+        if packed[:12] == b"\0" * 10 + b"\xff\xff":   # IPv4-mapped IPv6 address
+            return self.lookup_ipv4(int.from_bytes(packed[12:], "big"))
+        return self.lookup_ipv6(int.from_bytes(packed, "big"))
+
+    def close(self):
+        for part in reversed(self._views):   # the casts before the view they came from
+            part.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ------------------- Log Annotation -------------------
+
+# IPv6 candidates need all 8 groups or a "::", so times like 10:00:00 are never tried.
+# An IPv4 address may be followed by ":port"; an IPv6 one may not run on into more groups.
+_HEX = r"[0-9A-Fa-f]{1,4}"
+_IPV4 = r"\d{1,3}(?:\.\d{1,3}){3}"
+_IPV6 = (rf"(?:{_HEX}:){{7}}{_HEX}"
+         rf"|(?:{_HEX}:){{6}}{_IPV4}"
+         rf"|(?:{_HEX}(?::{_HEX}){{0,6}})?::(?:(?:{_HEX}:){{0,6}}(?:{_IPV4}|{_HEX}))?")
+IP_PATTERN = re.compile(rf"(?<![\w.:])(?:{_IPV4}|(?:{_IPV6})(?!:?[0-9A-Fa-f]))(?![\w.])")
+
+def annotate_lines(lines, db: GeoIPDatabase, unknown: str = "-"):
+    """
+    Yield each log line with the country of its first IP address appended (tab separated).
+    Results are remembered per IP, because logs repeat the same addresses a lot.
+    """
+    seen = {}
+    for line in lines:
+        line = line.rstrip("\n")
+        country = unknown
+        for match in IP_PATTERN.finditer(line):
+            ip = match.group()
+            if ip not in seen:
+                try:
+                    seen[ip] = db.lookup(ip) or unknown
+                except ValueError:
+                    seen[ip] = None   # looked like an IP but was not one
+            if seen[ip] is not None:
+                country = seen[ip]
+                break
+        yield f"{line}\t{country}\n"
+
+
+def annotate_file(db_path: str, log_path: str, out_path: str = None) -> int:
+    """Annotate a whole log file (to `out_path` or standard output). Returns the line count."""
+    count = 0
+    with GeoIPDatabase(db_path) as db, open(log_path) as src:
+        out = open(out_path, "w") if out_path else sys.stdout
+        try:
+            for annotated in annotate_lines(src, db):
+                out.write(annotated)
+                count += 1
+        finally:
+            if out_path:
+                out.close()
+    return count
+
+
+# ------------------- Pattern Check -------------------
+
+# (log line, addresses IP_PATTERN should find in it)
+PATTERN_CASES = [
+    ("conn from 1.2.3.4 ok", ["1.2.3.4"]),
+    ("conn from 1.2.3.4:80 ok", ["1.2.3.4"]),
+    ("error from 1.2.3.4: refused", ["1.2.3.4"]),
+    ("[2001:db8::1]:443 - GET /", ["2001:db8::1"]),
+    ("client 2001:db8::1 port 22", ["2001:db8::1"]),
+    ("mapped ::ffff:10.0.0.1 seen", ["::ffff:10.0.0.1"]),
+    ("full 2001:db8:0:0:0:0:0:1 form", ["2001:db8:0:0:0:0:0:1"]),
+    ("[19/Oct/2026:10:00:00] 5.6.7.8", ["5.6.7.8"]),
+    ("at 2026:10:00:00 nothing", []),
+    ("mac aa:bb:cc:dd:ee:ff", []),
+    ("version 1.2.3.4.5", []),
+]
+
+
+def check_ip_pattern() -> list:
+    """Run IP_PATTERN over PATTERN_CASES and return (line, passed, found) for each."""
+    results = []
+    for line, expected in PATTERN_CASES:
+        found = [match.group() for match in IP_PATTERN.finditer(line)]
+        results.append((line, found == expected, found))
+    return results
+
+
+# ------------------- Benchmark -------------------
+
+def benchmark_geoip(v4_ranges: int = 1_000_000, v6_ranges: int = 100_000,
+                    lookups: int = 200_000, log_lines: int = 200_000, seed: int = 1) -> dict:
+    """
+    Build a synthetic range table, compile it, and time loading, single
+    lookups (in microseconds) and bulk log annotation (lines per second).
+    """
+    rng = random.Random(seed)
+    codes = ["US", "GB", "DE", "JP", "BR", "CA", "AU", "FR", "IN", "NL"]
+    folder = tempfile.mkdtemp(prefix="geoip_bench_")
+    csv_path = os.path.join(folder, "ranges.csv")
+    db_path = os.path.join(folder, "geoip.db")
+
+    step4 = (2 ** 32) // v4_ranges
+    step6 = (2 ** 112) // v6_ranges   # the IPv6 ranges split up 2001::/16
+    with open(csv_path, "w") as f:
+        f.write("start_ip,end_ip,country\n")
+        for i in range(v4_ranges):
+            start = i * step4
+            f.write(f"{ipaddress.IPv4Address(start)},{ipaddress.IPv4Address(start + step4 - 2)},"
+                    f"{rng.choice(codes)}\n")
+        for i in range(v6_ranges):
+            start = (0x2001 << 112) + i * step6
+            f.write(f"{ipaddress.IPv6Address(start)},{ipaddress.IPv6Address(start + step6 - 1)},"
+                    f"{rng.choice(codes)}\n")
+
+    start = time.perf_counter()
+    compile_csv(csv_path, db_path)
+    compile_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    db = GeoIPDatabase(db_path)
+    load_time = time.perf_counter() - start
+
+    v4_ips = [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(lookups)]
+    v6_ips = [str(ipaddress.IPv6Address((0x2001 << 112) + rng.getrandbits(112)))
+              for _ in range(lookups)]
+    timings = {}
+    for label, ips in (("ipv4", v4_ips), ("ipv6", v6_ips)):
+        start = time.perf_counter()
+        for ip in ips:
+            db.lookup(ip)
+        timings[label] = (time.perf_counter() - start) / len(ips) * 1e6
+
+    # A log where addresses repeat, like a real access log
+    clients = v4_ips[:5000] + v6_ips[:1000]
+    lines = [f"{rng.choice(clients)} - - [19/Oct/2026:10:00:00] \"GET / HTTP/1.1\" 200 512\n"
+             for _ in range(log_lines)]
+    start = time.perf_counter()
+    for _ in annotate_lines(lines, db):
+        pass
+    annotate_rate = log_lines / (time.perf_counter() - start)
+
+    db.close()
+    for path in (csv_path, db_path):
+        os.remove(path)
+    os.rmdir(folder)
+    return {
+        "ranges": v4_ranges + v6_ranges,
+        "compile_s": compile_time,
+        "load_ms": load_time * 1000,
+        "ipv4_lookup_us": timings["ipv4"],
+        "ipv6_lookup_us": timings["ipv6"],
+        "annotate_lines_per_s": annotate_rate,
+    }
+
+
+# ------------------- Main -------------------
+
+USAGE = """Usage:
+  python geoip.py compile RANGES.csv [DB]
+  python geoip.py lookup DB IP [IP ...]
+  python geoip.py annotate DB LOGFILE [OUTFILE]
+  python geoip.py --check
+  python geoip.py --benchmark"""
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["--benchmark"]:
+        report = benchmark_geoip()
+        print(f"Ranges: {report['ranges']:,} (compiled in {report['compile_s']:.1f} s)")
+        print(f"Load time: {report['load_ms']:.3f} ms")
+        print(f"IPv4 lookup: {report['ipv4_lookup_us']:.2f} us")
+        print(f"IPv6 lookup: {report['ipv6_lookup_us']:.2f} us")
+        print(f"Annotate: {report['annotate_lines_per_s']:,.0f} lines/s")
+    elif args[:1] == ["--check"]:
+        checks = check_ip_pattern()
+        for line, passed, found in checks:
+            print(f"[{'PASS' if passed else 'FAIL'}] {line!r}: {found}")
+        sys.exit(0 if all(passed for _, passed, _ in checks) else 1)
+    elif args[:1] == ["compile"] and len(args) in (2, 3):
+        summary = compile_csv(*args[1:])
+        print(f"Compiled {summary['ipv4_ranges']} IPv4 and {summary['ipv6_ranges']} IPv6 ranges "
+              f"({summary['countries']} countries).")
+    elif args[:1] == ["lookup"] and len(args) >= 3:
+        with GeoIPDatabase(args[1]) as database:
+            for address in args[2:]:
+                print(f"{address}: {database.lookup(address) or 'unknown'}")
+    elif args[:1] == ["annotate"] and len(args) in (3, 4):
+        annotate_file(*args[1:])
+    else:
+        print(USAGE)
@@ -6,6 +6,9 @@ It supports user registration, login, logout, and automatically checks for sessi
 import bcrypt
 import time
 
+import metrics
+import audit_log
+
 
 # ------------------- Data Storage -------------------
 
@@ -14,6 +17,9 @@ sessions = {}       # Keeps track of active sessions and last activity
 
 SESSION_LIFETIME = 60  # Session timeout in seconds
 
+sessions_expired = metrics.counter("login_system_sessions_expired_total",
+                                   "Sessions removed because they timed out")
+
 
 # ------------------- User Registration -------------------
 
@@ -31,12 +37,16 @@ def register():
 
 # ------------------- User Login -------------------
 
+@metrics.timed("login_system_login", "login_system.login()",
+               outcome=lambda session_id: "success" if session_id else "failure")
 def login():
     username = input("Username: ")
     password = input("Password: ").encode()
 
     if username not in users:
         print("User not found.")
+        audit_log.record("login_failed", source="login_system", user=username,
+                         reason="unknown_user")
         return None
 
     if bcrypt.checkpw(password, users[username]):
@@ -47,14 +57,19 @@ def login():
             "last_active": time.time()
         }
         print("Login successful!")
+        audit_log.record("login_success", source="login_system", user=username)
         return session_id
     else:
         print("Incorrect password.")
+        audit_log.record("login_failed", source="login_system", user=username,
+                         reason="wrong_password")
         return None
 
 
 # ------------------- Session Check -------------------
 
+@metrics.timed("login_system_validate_session", "login_system.validate_session()",
+               outcome=lambda valid: "valid" if valid else "invalid")
 def validate_session(session_id: str) -> bool:
     # Look up the session
     session = sessions.get(session_id)
@@ -65,6 +80,9 @@ def validate_session(session_id: str) -> bool:
     # Check if the session has timed out
     if time.time() - session["last_active"] > SESSION_LIFETIME:
         print("Session expired.")
+        sessions_expired.inc()
+        audit_log.record("session_expired", source="login_system", user=session["username"],
+                         idle=round(time.time() - session["last_active"], 1))
         del sessions[session_id]
         return False
 
@@ -78,6 +96,7 @@ def validate_session(session_id: str) -> bool:
 def logout(session_id: str):
     # Remove session if it exists
     if session_id in sessions:
+        audit_log.record("logout", source="login_system", user=sessions[session_id]["username"])
         del sessions[session_id]
         print("Logged out successfully.")
     else:
@@ -0,0 +1,290 @@
+"""
+This module counts and times what happens in the login, vault and TLS code.
+It keeps counters and fixed-bucket latency histograms that can be read as a Python
+snapshot or in the Prometheus text format (optionally served over HTTP).
+Metrics are off unless NSP_METRICS=1 is set or enable() is called; while off, a
+wrapped function only pays for one flag check (well under a microsecond).
+"""
+
+import os
+import sys
+import time
+import bisect
+import threading
+from functools import wraps
+
+
+# ------------------- SETTINGS -------------------
+
+# Upper bounds (in seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_enabled = os.environ.get("NSP_METRICS", "").lower() in ("1", "true", "yes")
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def enable():
+    """Start recording metrics."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Stop recording metrics (wrapped functions then run almost untouched)."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+# ------------------- Metric Types -------------------
+
+class Counter:
+    """A number that only goes up, optionally split by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str = "", labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}   # tuple of label values -> count
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        """Add to the counter (does nothing while metrics are disabled)."""
+        if not _enabled:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {",".join(key): value for key, value in self._values.items()}
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_number(value)}"
+                for key, value in items]
+
+
+class Histogram:
+    """Counts observations in fixed buckets and keeps their total sum."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str = "", buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record one value (does nothing while metrics are disabled)."""
+        if not _enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else _format_number(bound)] = cumulative
+        return {"buckets": buckets, "count": cumulative, "sum": total}
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._sum = 0.0
+
+    def render(self) -> list:
+        snap = self.snapshot()
+        lines = [f'{self.name}_bucket{{le="{bound}"}} {count}'
+                 for bound, count in snap["buckets"].items()]
+        lines.append(f"{self.name}_sum {_format_number(snap['sum'])}")
+        lines.append(f"{self.name}_count {snap['count']}")
+        return lines
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value) -> str:
+    """Escape a label value the way the Prometheus text format expects."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# ------------------- Registry -------------------
+
+def _get_or_create(cls, name: str, *args):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, *args)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"metric {name!r} already exists as a {metric.kind}")
+        return metric
+
+
+def counter(name: str, help_text: str = "", labels=()) -> Counter:
+    """Return the counter with this name, creating it the first time."""
+    return _get_or_create(Counter, name, help_text, labels)
+
+
+def histogram(name: str, help_text: str = "", buckets=LATENCY_BUCKETS) -> Histogram:
+    """Return the histogram with this name, creating it the first time."""
+    return _get_or_create(Histogram, name, help_text, buckets)
+
+
+def snapshot() -> dict:
+    """Return every metric's current values as plain Python data."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return {m.name: {"type": m.kind, "help": m.help, "values": m.snapshot()} for m in metrics}
+
+
+def render_prometheus() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    lines = []
+    for m in metrics:
+        if m.help:
+            lines.append(f"# HELP {m.name} {m.help}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Set every metric back to zero (the metrics themselves stay registered)."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for m in metrics:
+        m.reset()
+
+
+# ------------------- Function Wrapper -------------------
+
+def timed(name: str, help_text: str = "", outcome=None):
+    """
+    Decorator that records how long each call takes in `<name>_seconds` and counts
+    calls in `<name>_total`. If `outcome` is given, it maps the return value to a
+    label (like "success"); calls that raise are counted as "error".
+    """
+    latency = histogram(f"{name}_seconds", f"Latency of {help_text or name}")
+    calls = counter(f"{name}_total", f"Calls to {help_text or name}", ("outcome",))
+
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                latency.observe(time.perf_counter() - start)
+                calls.inc("error")
+                raise
+            latency.observe(time.perf_counter() - start)
+            calls.inc(outcome(result) if outcome else "ok")
+            return result
+        return wrapper
+    return decorate
+
+
+# ------------------- HTTP Endpoint -------------------
+
+def start_http_server(port: int = 9108, host: str = "127.0.0.1"):
+    """Serve render_prometheus() at http://host:port/metrics in a background thread."""
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if _enabled and os.environ.get("NSP_METRICS_PORT"):
+    start_http_server(int(os.environ["NSP_METRICS_PORT"]))
+
+
+# ------------------- Benchmark -------------------
+
+def benchmark_overhead(calls: int = 1_000_000) -> dict:
+    """Measure the extra time per call (in nanoseconds) a @timed wrapper adds."""
+    was_enabled = _enabled
+
+    def plain(x):
+        return x
+
+    wrapped = timed("overhead_benchmark")(plain)
+
+    def per_call(func):
+        start = time.perf_counter()
+        for i in range(calls):
+            func(i)
+        return (time.perf_counter() - start) / calls * 1e9
+
+    base = per_call(plain)
+    disable()
+    off = per_call(wrapped)
+    enable()
+    on = per_call(wrapped)
+
+    with _registry_lock:
+        _registry.pop("overhead_benchmark_seconds", None)
+        _registry.pop("overhead_benchmark_total", None)
+    if not was_enabled:
+        disable()
+    return {"disabled_ns": off - base, "enabled_ns": on - base}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        report = benchmark_overhead()
+        print(f"Overhead per call, disabled: {report['disabled_ns']:.0f} ns")
+        print(f"Overhead per call, enabled:  {report['enabled_ns']:.0f} ns")
+    else:
+        print("Usage: python metrics.py --benchmark")
@@ -1,17 +1,284 @@
 """
-This program checks if a given URL is secure by validating that it uses HTTPS and has a valid SSL certificate.  
+This program checks if a given URL is secure by validating that it uses HTTPS and has a valid SSL certificate.
 It reports whether the certificate is valid, expired, or if the connection is insecure.
+It can also reuse one SSL context and cache DNS/certificate results when the same hosts are checked repeatedly.
 """
 
+import os
 import ssl
+import sys
+import time
+import errno
 import socket
+import selectors
+import threading
 from urllib.parse import urlparse
 from datetime import datetime
 
+import metrics
 
-def verify_url_security(url: str) -> str:
+
+DEFAULT_PORT = 443      # HTTPS port used when the URL does not give one
+CONNECT_TIMEOUT = 5.0   # seconds to wait for the server
+ATTEMPT_DELAY = 0.25    # seconds between racing connection attempts (RFC 8305)
+DNS_CACHE_TTL = 300     # seconds to remember a DNS answer
+CERT_CACHE_TTL = 3600   # seconds to remember a certificate (never past its notAfter)
+
+
+# ------------------- Shared SSL Context -------------------
+
+_shared_context = None
+_context_lock = threading.Lock()
+
+def get_shared_context() -> ssl.SSLContext:
+    """
+    Return one default SSL context for the whole program.
+    Creating a context loads the full CA bundle, so we only do it once.
+    """
+    global _shared_context
+    if _shared_context is None:
+        with _context_lock:
+            if _shared_context is None:
+                _shared_context = ssl.create_default_context()
+    return _shared_context
+
+
+# ------------------- Connection Helpers -------------------
+
+def resolve_host(host: str, port: int = DEFAULT_PORT) -> list:
+    """
+    Look up the host (IPv6 and IPv4) and return a list of (family, sockaddr) pairs.
+    The families are interleaved, IPv6 first, as RFC 8305 recommends.
+    """
+    infos = socket.getaddrinfo(host, port, socket.AF_UNSPEC, socket.SOCK_STREAM)
+    ipv6 = [(family, sockaddr) for family, _, _, _, sockaddr in infos if family == socket.AF_INET6]
+    ipv4 = [(family, sockaddr) for family, _, _, _, sockaddr in infos if family != socket.AF_INET6]
+
+    addresses = []
+    for i in range(max(len(ipv6), len(ipv4))):
+        addresses.extend(ipv6[i:i + 1])
+        addresses.extend(ipv4[i:i + 1])
+    return addresses
+
+
+def happy_eyeballs_connect(addresses: list, timeout: float = CONNECT_TIMEOUT,
+                           attempt_delay: float = ATTEMPT_DELAY) -> socket.socket:
+    """
+    Race TCP connections to the given addresses and return the first one that connects.
+    A new attempt starts every `attempt_delay` seconds (or straight away when the
+    previous one fails), so one slow or dead address cannot stall the whole check.
+    """
+    if not addresses:
+        raise OSError("no addresses to connect to")
+
+    deadline = time.monotonic() + timeout
+    waiting = list(addresses)
+    pending = []
+    winner = None
+    last_error = None
+    next_start = time.monotonic()
+    selector = selectors.DefaultSelector()
+
+    try:
+        while winner is None and (waiting or pending):
+            now = time.monotonic()
+            if now >= deadline:
+                raise socket.timeout("timed out")
+
+            # Start the next attempt when its turn comes (or nothing else is running)
+            if waiting and (now >= next_start or not pending):
+                family, sockaddr = waiting.pop(0)
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                sock.setblocking(False)
+                err = sock.connect_ex(sockaddr)
+                if err == 0:
+                    winner = sock
+                    break
+                if err in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+                    selector.register(sock, selectors.EVENT_WRITE)
+                    pending.append(sock)
+                    next_start = now + attempt_delay
+                else:
+                    sock.close()
+                    last_error = OSError(err, os.strerror(err))
+                continue
+
+            wake_at = min(deadline, next_start) if waiting else deadline
+            for key, _ in selector.select(max(0.0, wake_at - now)):
+                sock = key.fileobj
+                selector.unregister(sock)
+                pending.remove(sock)
+                err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if err == 0:
+                    winner = sock
+                    break
+                sock.close()
+                last_error = OSError(err, os.strerror(err))
+                next_start = time.monotonic()   # a failure lets the next attempt go now
+    finally:
+        # Close every attempt that lost the race
+        for sock in pending:
+            if sock is not winner:
+                sock.close()
+        selector.close()
+
+    if winner is None:
+        raise last_error
+    winner.setblocking(True)
+    winner.settimeout(max(0.001, deadline - time.monotonic()))
+    return winner
+
+
+def fetch_certificate(host: str, port: int = DEFAULT_PORT, context=None,
+                      timeout: float = CONNECT_TIMEOUT, addresses=None, timings=None) -> dict:
+    """
+    Connect to the host, complete the TLS handshake and return the peer certificate.
+    Already resolved addresses can be passed in to skip the DNS lookup.
+    If a `timings` dict is given, the DNS, TCP and TLS times (in seconds) and the
+    address that won the connection race are written into it.
+    """
+    context = context or get_shared_context()
+    timings = {} if timings is None else timings
+
+    start = time.perf_counter()
+    if addresses is None:
+        addresses = resolve_host(host, port)
+    timings["dns"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    raw = happy_eyeballs_connect(addresses, timeout)
+    timings["tcp"] = time.perf_counter() - start
+    timings["address"] = raw.getpeername()[0]
+
+    start = time.perf_counter()
+    with context.wrap_socket(raw, server_hostname=host) as conn:
+        cert = conn.getpeercert()
+    timings["tls"] = time.perf_counter() - start
+    return cert
+
+
+def describe_certificate(cert: dict) -> str:
+    """Turn a certificate into the status message shown to the user."""
+    expiry_raw = cert.get("notAfter")
+    expiry_date = datetime.strptime(expiry_raw, "%b %d %H:%M:%S %Y %Z")
+    now = datetime.utcnow()
+
+    if expiry_date < now:
+        return f"SSL certificate expired on {expiry_date}."
+    return f"Secure: valid SSL certificate (expires {expiry_date})."
+
+
+# ------------------- Cached Checker -------------------
+
+class TLSChecker:
+    """
+    Checks certificates with one shared SSL context and remembers the results.
+    DNS answers and certificates are cached per host with a TTL, and a cached
+    certificate is always dropped before its notAfter date.
+    """
+
+    def __init__(self, dns_ttl: float = DNS_CACHE_TTL, cert_ttl: float = CERT_CACHE_TTL,
+                 timeout: float = CONNECT_TIMEOUT, context=None):
+        self.dns_ttl = dns_ttl
+        self.cert_ttl = cert_ttl
+        self.timeout = timeout
+        self.context = context or get_shared_context()
+        self._dns_cache = {}    # (host, port) -> (expires_at, addresses)
+        self._cert_cache = {}   # (host, port) -> (expires_at, cert)
+        self._lock = threading.Lock()
+        self.dns_hits = 0
+        self.dns_misses = 0
+        self.cert_hits = 0
+        self.cert_misses = 0
+
+    def resolve(self, host: str, port: int = DEFAULT_PORT) -> list:
+        """Return the addresses for a host, using the DNS cache when possible."""
+        key = (host, port)
+        now = time.time()
+        with self._lock:
+            entry = self._dns_cache.get(key)
+            if entry and entry[0] > now:
+                self.dns_hits += 1
+                return entry[1]
+            self.dns_misses += 1
+
+        addresses = resolve_host(host, port)
+        with self._lock:
+            self._dns_cache[key] = (now + self.dns_ttl, addresses)
+        return addresses
+
+    def get_certificate(self, host: str, port: int = DEFAULT_PORT, timings=None) -> dict:
+        """
+        Return the certificate for a host, connecting only on a cache miss.
+        On a miss the `timings` dict (if given) is filled in like fetch_certificate does.
+        """
+        key = (host, port)
+        now = time.time()
+        with self._lock:
+            entry = self._cert_cache.get(key)
+            if entry and entry[0] > now:
+                self.cert_hits += 1
+                return entry[1]
+            self._cert_cache.pop(key, None)
+            self.cert_misses += 1
+
+        start = time.perf_counter()
+        addresses = self.resolve(host, port)
+        dns_time = time.perf_counter() - start
+        cert = fetch_certificate(host, port, self.context, self.timeout,
+                                 addresses=addresses, timings=timings)
+        if timings is not None:
+            timings["dns"] = dns_time
+
+        # Never keep a certificate in the cache past its own expiry date
+        expires_at = now + self.cert_ttl
+        if cert.get("notAfter"):
+            expires_at = min(expires_at, ssl.cert_time_to_seconds(cert["notAfter"]))
+        with self._lock:
+            self._cert_cache[key] = (expires_at, cert)
+        return cert
+
+    def invalidate(self, host: str, port: int = DEFAULT_PORT):
+        """Forget everything cached for one host."""
+        with self._lock:
+            self._dns_cache.pop((host, port), None)
+            self._cert_cache.pop((host, port), None)
+
+    def clear(self):
+        """Empty both caches (the counters are kept)."""
+        with self._lock:
+            self._dns_cache.clear()
+            self._cert_cache.clear()
+
+    def stats(self) -> dict:
+        """Return the cache hit/miss counters."""
+        with self._lock:
+            return {
+                "dns_hits": self.dns_hits,
+                "dns_misses": self.dns_misses,
+                "cert_hits": self.cert_hits,
+                "cert_misses": self.cert_misses,
+            }
+
+
+# ------------------- URL Check -------------------
+
+def status_outcome(status: str) -> str:
+    """Turn a status message into a short metrics label."""
+    for prefix, label in (("Secure", "secure"), ("Insecure", "insecure"), ("Invalid", "invalid"),
+                          ("SSL certificate expired", "expired"), ("SSL error", "ssl_error"),
+                          ("Connection timed out", "timeout")):
+        if status.startswith(prefix):
+            return label
+    return "error"
+
+
+@metrics.timed("verify_url_security", "verify_url_security()", outcome=status_outcome)
+def verify_url_security(url: str, checker: TLSChecker = None, timings=None) -> str:
     """
     Verify if the provided URL is secure by checking its scheme and SSL certificate.
+    Pass a TLSChecker to reuse cached DNS and certificate results, and a dict as
+    `timings` to get the DNS/TCP/TLS times of the connection.
     Returns a message describing the security status.
     """
     try:
@@ -28,20 +295,13 @@ def verify_url_security(url: str) -> str:
             return "Insecure: connection uses HTTP (not encrypted)."
 
         # Establish SSL connection and fetch certificate
-        context = ssl.create_default_context()
-        with context.wrap_socket(socket.socket(socket.AF_INET), server_hostname=host) as conn:
-            conn.settimeout(5.0)
-            conn.connect((host, 443))
-            cert = conn.getpeercert()
-
-        # Parse certificate expiry
-        expiry_raw = cert.get("notAfter")
-        expiry_date = datetime.strptime(expiry_raw, "%b %d %H:%M:%S %Y %Z")
-        now = datetime.utcnow()
+        port = parsed.port or DEFAULT_PORT
+        if checker is not None:
+            cert = checker.get_certificate(host, port, timings)
+        else:
+            cert = fetch_certificate(host, port, timings=timings)
 
-        if expiry_date < now:
-            return f"SSL certificate expired on {expiry_date}."
-        return f"Secure: valid SSL certificate (expires {expiry_date})."
+        return describe_certificate(cert)
 
     except ssl.SSLError:
         return "SSL error: invalid or untrusted certificate."
@@ -51,9 +311,160 @@ def verify_url_security(url: str) -> str:
         return f"Unexpected error: {e}"
 
 
+# ------------------- Benchmark -------------------
+
+def benchmark_checks(urls: list, rounds: int = 5, checker: TLSChecker = None) -> dict:
+    """
+    Scan the same URLs several times, once without and once with the cache.
+    The uncached run uses the same SSL context with both TTLs set to zero.
+    Returns the average time per check (in milliseconds) for both runs.
+    """
+    checker = checker or TLSChecker()
+    uncached = TLSChecker(dns_ttl=0, cert_ttl=0, timeout=checker.timeout, context=checker.context)
+    results = {}
+
+    for label, current in (("uncached", uncached), ("cached", checker)):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for url in urls:
+                verify_url_security(url, current)
+        elapsed = time.perf_counter() - start
+        results[label] = elapsed / (rounds * len(urls)) * 1000
+
+    results.update(checker.stats())
+    return results
+
+
+# ------------------- Connection Racing Check -------------------
+
+def _loopback_hosts() -> list:
+    """Return (family, host) for the loopback addresses this machine supports (::1 first)."""
+    hosts = []
+    if socket.has_ipv6:
+        try:
+            with socket.socket(socket.AF_INET6, socket.SOCK_STREAM) as probe:
+                probe.bind(("::1", 0))
+            hosts.append((socket.AF_INET6, "::1"))
+        except OSError:
+            pass
+    hosts.append((socket.AF_INET, "127.0.0.1"))
+    return hosts
+
+
+def _open_listener(family: int, host: str, stalled: bool = False):
+    """
+    Start a loopback listener and return (address entry, sockets to close later).
+    A stalled listener has its accept queue filled, so new connections hang like a
+    dead host instead of connecting or being refused.
+    """
+    listener = socket.socket(family, socket.SOCK_STREAM)
+    listener.bind((host, 0))
+    listener.listen(0 if stalled else 16)
+    sockaddr = listener.getsockname()
+    keep = [listener]
+    if stalled:
+        for _ in range(3):
+            filler = socket.socket(family, socket.SOCK_STREAM)
+            filler.setblocking(False)
+            filler.connect_ex(sockaddr)
+            keep.append(filler)
+        time.sleep(0.1)   # let the handshakes of the fillers complete
+    return (family, sockaddr), keep
+
+
+def _refused_address(family: int, host: str):
+    """Return an address entry for a loopback port with nothing listening on it."""
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return family, sock.getsockname()
+
+
+def check_connection_racing(attempt_delay: float = ATTEMPT_DELAY, timeout: float = 1.0) -> list:
+    """
+    Run happy_eyeballs_connect against local listeners with injected delays and
+    return (name, passed, details) for each case:
+    a stalled first address must lose to the next one after about `attempt_delay`,
+    a refused address must hand over to the next one straight away,
+    and when every address stalls the call must give up after `timeout`.
+    """
+    hosts = _loopback_hosts()
+    slow_family, slow_host = hosts[-1]   # 127.0.0.1
+    fast_family, fast_host = hosts[0]    # ::1 when available
+    margin = 0.15
+    results = []
+    sockets = []
+
+    def run(addresses, **kwargs):
+        start = time.perf_counter()
+        try:
+            sock = happy_eyeballs_connect(addresses, attempt_delay=attempt_delay, **kwargs)
+            peer = sock.getpeername()[:2]
+            sock.close()
+            return peer, None, time.perf_counter() - start
+        except OSError as e:
+            return None, e, time.perf_counter() - start
+
+    try:
+        stalled, keep = _open_listener(slow_family, slow_host, stalled=True)
+        sockets += keep
+        good, keep = _open_listener(fast_family, fast_host)
+        sockets += keep
+
+        peer, error, elapsed = run([stalled, good], timeout=timeout)
+        passed = (error is None and peer == good[1][:2]
+                  and attempt_delay <= elapsed < attempt_delay + margin)
+        results.append(("stalled first address loses after the attempt delay", passed,
+                        f"connected to {peer} in {elapsed * 1000:.0f} ms" if error is None
+                        else f"failed after {elapsed * 1000:.0f} ms: {error}"))
+
+        refused = _refused_address(slow_family, slow_host)
+        peer, error, elapsed = run([refused, good], timeout=timeout)
+        passed = error is None and peer == good[1][:2] and elapsed < attempt_delay / 2
+        results.append(("refused address falls through immediately", passed,
+                        f"connected to {peer} in {elapsed * 1000:.0f} ms" if error is None
+                        else f"failed after {elapsed * 1000:.0f} ms: {error}"))
+
+        second, keep = _open_listener(fast_family, fast_host, stalled=True)
+        sockets += keep
+        peer, error, elapsed = run([stalled, second], timeout=timeout)
+        passed = isinstance(error, socket.timeout) and timeout <= elapsed < timeout + margin
+        results.append(("every address stalled: gives up at the timeout", passed,
+                        f"raised {type(error).__name__} after {elapsed * 1000:.0f} ms"
+                        if error else f"unexpectedly connected to {peer}"))
+
+        peer, error, elapsed = run([refused, _refused_address(fast_family, fast_host)],
+                                   timeout=timeout)
+        passed = (isinstance(error, OSError) and not isinstance(error, socket.timeout)
+                  and elapsed < attempt_delay / 2)
+        results.append(("every address refused: fails straight away", passed,
+                        f"raised {error!r} after {elapsed * 1000:.0f} ms"
+                        if error else f"unexpectedly connected to {peer}"))
+    finally:
+        for sock in sockets:
+            sock.close()
+    return results
+
+
 # ------------------- Main -------------------
 
 if __name__ == "__main__":
-    url = input("Enter a URL (e.g. https://example.com): ").strip()
-    status = verify_url_security(url)
-    print(status)
+    if len(sys.argv) > 1 and sys.argv[1] == "--check-racing":
+        checks = check_connection_racing()
+        for name, passed, details in checks:
+            print(f"[{'PASS' if passed else 'FAIL'}] {name}: {details}")
+        sys.exit(0 if all(passed for _, passed, _ in checks) else 1)
+    elif len(sys.argv) > 2 and sys.argv[1] == "--benchmark":
+        report = benchmark_checks(sys.argv[2:])
+        print(f"Uncached: {report['uncached']:.2f} ms per check")
+        print(f"Cached:   {report['cached']:.2f} ms per check")
+        print(f"Cert cache hits/misses: {report['cert_hits']}/{report['cert_misses']}")
+        print(f"DNS cache hits/misses:  {report['dns_hits']}/{report['dns_misses']}")
+    else:
+        url = input("Enter a URL (e.g. https://example.com): ").strip()
+        timings = {}
+        status = verify_url_security(url, timings=timings)
+        print(status)
+        if "tls" in timings:
+            print(f"Connected to {timings['address']} "
+                  f"(DNS {timings['dns'] * 1000:.1f} ms, TCP {timings['tcp'] * 1000:.1f} ms, "
+                  f"TLS {timings['tls'] * 1000:.1f} ms)")
@@ -0,0 +1,265 @@
+"""
+This program finds your public IP address by asking several lookup services at the same time.
+The first valid answer wins, so one slow or broken service does not hold everything up.
+Connections are kept alive and reused between lookups, the answer is cached for a short time,
+and failures are raised as proper exceptions instead of being returned as text.
+"""
+
+import sys
+import json
+import time
+import ipaddress
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# ------------------- SETTINGS -------------------
+
+PROVIDERS = (
+    "https://api.ipify.org?format=json",
+    "https://ifconfig.me/ip",
+    "https://icanhazip.com",
+)
+REQUEST_TIMEOUT = 3.0   # seconds to wait for an answer from any provider
+CACHE_TTL = 60          # seconds to remember the answer
+
+
+# ------------------- Errors -------------------
+
+class PublicIPError(Exception):
+    """Base class for public IP lookup errors."""
+
+
+class ProviderError(PublicIPError):
+    """One provider failed or returned something that is not an IP address."""
+
+    def __init__(self, provider: str, reason: str):
+        super().__init__(f"{provider}: {reason}")
+        self.provider = provider
+        self.reason = reason
+
+
+class LookupFailedError(PublicIPError):
+    """No provider returned a valid IP address in time."""
+
+    def __init__(self, errors: list):
+        details = "; ".join(str(e) for e in errors) or "no provider answered in time"
+        super().__init__(f"could not determine public IP ({details})")
+        self.errors = errors
+
+
+# ------------------- Helpers -------------------
+
+def parse_ip_response(text: str) -> str:
+    """
+    Read an IP from a provider's reply. Both JSON ({"ip": "..."}) and plain
+    text replies are accepted. Raises ValueError if there is no valid IP.
+    """
+    text = text.strip()
+    if text.startswith("{"):
+        text = str(json.loads(text).get("ip", ""))
+    return str(ipaddress.ip_address(text))
+
+
+# ------------------- Resolver -------------------
+
+class PublicIPResolver:
+    """
+    Races several IP lookup providers and returns the first valid answer.
+    Each provider has its own keep-alive session. A provider whose last request
+    is still running is not asked again; the new lookup just waits on that request.
+    """
+
+    def __init__(self, providers=PROVIDERS, timeout: float = REQUEST_TIMEOUT,
+                 cache_ttl: float = CACHE_TTL):
+        if not providers:
+            raise ValueError("at least one provider is needed")
+        self.providers = list(providers)
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self._sessions = {}
+        for url in self.providers:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._sessions[url] = session
+        self._pool = ThreadPoolExecutor(max_workers=len(self.providers),
+                                        thread_name_prefix="public-ip")
+        self._in_flight = {}   # provider -> Future still running
+        self._cached = None    # (expires_at, ip)
+        self._lock = threading.Lock()
+
+    def _query(self, url: str) -> str:
+        """Ask one provider for the IP. Raises ProviderError on any problem."""
+        try:
+            resp = self._sessions[url].get(url, timeout=self.timeout)
+            resp.raise_for_status()
+            return parse_ip_response(resp.text)
+        except requests.RequestException as e:
+            raise ProviderError(url, type(e).__name__) from e
+        except ValueError as e:
+            raise ProviderError(url, f"invalid answer ({e})") from e
+
+    def _start_queries(self) -> list:
+        """Start (or re-use) one request per provider."""
+        futures = []
+        with self._lock:
+            for url in self.providers:
+                future = self._in_flight.get(url)
+                if future is None or future.done():
+                    future = self._pool.submit(self._query, url)
+                    self._in_flight[url] = future
+                futures.append(future)
+        return futures
+
+    def resolve(self, use_cache: bool = True) -> str:
+        """Return the public IP. Raises LookupFailedError if every provider fails."""
+        now = time.monotonic()
+        with self._lock:
+            if use_cache and self._cached and self._cached[0] > now:
+                return self._cached[1]
+
+        deadline = now + self.timeout
+        pending = set(self._start_queries())
+        errors = []
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    ip = future.result()
+                except ProviderError as e:
+                    errors.append(e)
+                    continue
+                with self._lock:
+                    self._cached = (time.monotonic() + self.cache_ttl, ip)
+                return ip
+
+        raise LookupFailedError(errors)
+
+    def clear_cache(self):
+        """Forget the cached IP so the next lookup asks the providers again."""
+        with self._lock:
+            self._cached = None
+
+    def close(self):
+        """Close the keep-alive sessions and stop the worker threads."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for session in self._sessions.values():
+            session.close()
+
+
+_default_resolver = None
+_default_lock = threading.Lock()
+
+def get_public_ip() -> str:
+    """Return the public IP using one shared resolver (and its cache)."""
+    global _default_resolver
+    with _default_lock:
+        if _default_resolver is None:
+            _default_resolver = PublicIPResolver()
+    return _default_resolver.resolve()
+
+
+# ------------------- Benchmark -------------------
+
+def _start_stand_in(behaviour: str, delay: float):
+    """Start a local HTTP server that answers fast, fails, or hangs."""
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive, like the real providers
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(delay)
+            if behaviour == "fail":
+                body, status = b"internal error", 500
+            else:
+                body, status = b'{"ip": "203.0.113.7"}', 200
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+
+        def handle_error(self, request, client_address):
+            pass   # the client gave up on a hanging request; nothing to report
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def benchmark_lookup(lookups: int = 50, timeout: float = 1.0) -> dict:
+    """
+    Compare the raced resolver with the old one-provider-at-a-time approach
+    when one local provider hangs and one fails. Caching is turned off so
+    every lookup really hits the providers. Times are in milliseconds.
+    """
+    servers = [
+        _start_stand_in("hang", timeout * 3),
+        _start_stand_in("fail", 0.005),
+        _start_stand_in("ok", 0.010),
+    ]
+    urls = [url for _, url in servers]
+
+    def sequential():
+        # One fresh request per provider, in order, until one works
+        for url in urls:
+            try:
+                resp = requests.get(url, timeout=timeout)
+                resp.raise_for_status()
+                return parse_ip_response(resp.text)
+            except (requests.RequestException, ValueError):
+                continue
+        raise LookupFailedError([])
+
+    resolver = PublicIPResolver(urls, timeout=timeout, cache_ttl=0)
+    results = {}
+    for label, lookup in (("sequential", sequential),
+                          ("raced", lambda: resolver.resolve(use_cache=False))):
+        times = []
+        for _ in range(lookups):
+            start = time.perf_counter()
+            lookup()
+            times.append((time.perf_counter() - start) * 1000)
+        results[label] = {"p50": _percentile(times, 50), "p99": _percentile(times, 99),
+                          "max": max(times)}
+
+    resolver.close()
+    for server, _ in servers:
+        server.shutdown()
+    return results
+
+
+# ------------------- Main -------------------
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        report = benchmark_lookup()
+        for label, stats in report.items():
+            print(f"{label:>10}: p50 {stats['p50']:.1f} ms, p99 {stats['p99']:.1f} ms, "
+                  f"max {stats['max']:.1f} ms")
+    else:
+        try:
+            print(f"Your public IP: {get_public_ip()}")
+        except PublicIPError as e:
+            print(f"Error: {e}")
@@ -0,0 +1,397 @@
+"""
+This module keeps the encrypted vault file safe when several programs use it at once.
+Every save locks the vault, re-reads the latest version from disk, applies its changes
+and replaces the file atomically (write to a temp file, fsync, rename). A crash can
+never leave half a vault behind, and one program can no longer overwrite entries
+another program just saved. Readers never take the lock: the rename means they always
+see either the old or the new vault in full.
+Saves are grouped into commits across threads and programs: each save first appends
+its changes to a journal file (a quick append, no fsync), then whoever gets the commit
+lock applies every change in the journal with a single encrypt + fsync + rename.
+The others find their changes already committed and return without writing.
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import tempfile
+import threading
+
+from cryptography.fernet import Fernet, InvalidToken
+
+try:
+    import fcntl       # Linux / macOS
+except ImportError:
+    fcntl = None
+    import msvcrt      # Windows
+
+
+# ------------------- SETTINGS -------------------
+
+REPLACE_RETRIES = 20     # Windows refuses to replace a file someone is reading; retry briefly
+REPLACE_RETRY_DELAY = 0.01
+COMMIT_POLL_INTERVAL = 0.001   # seconds between checks while someone else is committing
+
+
+# ------------------- Errors -------------------
+
+class VaultError(Exception):
+    """Base class for vault storage errors."""
+
+
+class VaultCorruptedError(VaultError):
+    """The vault file exists but cannot be decrypted or parsed."""
+
+    def __init__(self, path: str, reason: str):
+        super().__init__(f"{path}: {reason}")
+        self.path = path
+        self.reason = reason
+
+
+# ------------------- File Lock -------------------
+
+class FileLock:
+    """
+    An exclusive lock shared between processes, held on a separate `.lock` file.
+    The threads of one process can share a FileLock object too.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._thread_lock = threading.Lock()
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Take the lock. With blocking=False, return False at once if someone else holds it."""
+        if not self._thread_lock.acquire(blocking):
+            return False
+        try:
+            self._file = open(self.path, "a+b")
+            if self._lock_file(blocking):
+                return True
+            self._file.close()
+            self._file = None
+        except BaseException:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._thread_lock.release()
+            raise
+        self._thread_lock.release()
+        return False
+
+    def _lock_file(self, blocking: bool) -> bool:
+        if fcntl:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(self._file.fileno(), flags)
+                return True
+            except BlockingIOError:
+                return False
+        self._file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                # LK_LOCK gives up after ~10 seconds; keep waiting
+
+    def release(self):
+        try:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._file.close()
+        finally:
+            self._file = None
+            self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+# ------------------- Vault Store -------------------
+
+_DELETE = object()   # marks an entry to remove in a change set
+
+
+class VaultStore:
+    """
+    An encrypted JSON dictionary on disk that several threads and processes
+    can read and update at the same time without losing each other's changes.
+    """
+
+    def __init__(self, path: str, cipher: Fernet, durable: bool = True):
+        self.path = os.path.abspath(path)
+        self.cipher = cipher
+        self.durable = durable          # fsync the file and its folder on every commit
+        self.journal_path = self.path + ".journal"
+        self.commits = 0                # commits (fsyncs) made by this object
+        self.writes = 0                 # updates saved through this object
+        self._lock = FileLock(self.path + ".lock")                    # held while committing
+        self._journal_lock = FileLock(self.journal_path + ".lock")    # held only to append or trim
+        self._cache_lock = threading.Lock()
+        self._cache = (None, {}, b"{}")   # (encrypted file contents, decrypted data, JSON text)
+
+    # ---- Reading ----
+
+    def snapshot(self) -> dict:
+        """Return a private copy of the current vault contents (no lock needed)."""
+        return json.loads(self._read()[1])   # parsing the cached text is cheaper than deepcopy
+
+    def get(self, name: str, default=None):
+        value = self._read()[0].get(name, default)
+        return copy.deepcopy(value)
+
+    def _read(self, cached: bool = True) -> tuple:
+        """
+        Return (data, JSON text) of the vault, decrypting again only if the file has changed
+        (or always, with cached=False). The file is always read; the cache is keyed on its
+        exact bytes, not on stat() results (inodes get reused and mtimes can be coarse).
+        Every commit has a new random IV, so any change gives different bytes.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                encrypted = f.read()
+        except FileNotFoundError:
+            return {}, b"{}"
+        with self._cache_lock:
+            if cached and self._cache[0] == encrypted:
+                return self._cache[1:]
+        data, text = self._decode(encrypted)
+        with self._cache_lock:
+            self._cache = (encrypted, data, text)
+        return data, text
+
+    def invalidate(self):
+        """Forget the decrypted copy, so the next read decrypts the file again."""
+        with self._cache_lock:
+            self._cache = (None, {}, b"{}")
+
+    def _decode(self, encrypted: bytes) -> tuple:
+        try:
+            text = self.cipher.decrypt(encrypted)
+            data = json.loads(text)
+        except InvalidToken:
+            raise VaultCorruptedError(self.path, "cannot decrypt (wrong key or damaged file)") from None
+        except ValueError as e:
+            raise VaultCorruptedError(self.path, f"decrypted data is not valid JSON ({e})") from None
+        if not isinstance(data, dict):
+            raise VaultCorruptedError(self.path, "decrypted data is not a JSON object")
+        return data, text
+
+    # ---- Writing ----
+
+    def put(self, name: str, value):
+        """Save one entry."""
+        self.update({name: value})
+
+    def delete(self, name: str):
+        """Remove one entry (if it exists)."""
+        self.update({name: _DELETE})
+
+    def update(self, changes: dict):
+        """
+        Save several entries in one go. Returns once the changes are in the vault on disk.
+        The changes are appended to the journal. Whoever gets the commit lock commits
+        everything journaled so far, so while one thread or program is committing, the
+        others' changes pile up for the next commit. Waiting writers only poll the
+        journal instead of queueing for the lock: once their changes are in, they return
+        without sitting behind yet another commit.
+        """
+        seq = self._append(changes)
+        while self._journal_start() <= seq:   # not committed yet
+            if self._lock.acquire(blocking=False):
+                try:
+                    if self._journal_start() <= seq:
+                        self._commit()
+                finally:
+                    self._lock.release()
+                return
+            time.sleep(COMMIT_POLL_INTERVAL)
+
+    # ---- Journal ----
+    #
+    # The journal starts with the sequence number of its first record, followed by
+    # one encrypted change set per line. A record whose number is below the first
+    # one has been committed. If a commit dies after writing the vault but before
+    # trimming the journal, the next commit simply applies those records again.
+
+    def _append(self, changes: dict) -> int:
+        """Add a change set to the journal and return its sequence number."""
+        record = {"put": {}, "delete": []}
+        for name, value in changes.items():
+            if value is _DELETE:
+                record["delete"].append(name)
+            else:
+                record["put"][name] = value
+        token = self.cipher.encrypt(json.dumps(record).encode())   # the journal holds secrets too
+        with self._journal_lock:
+            with open(self.journal_path, "a+b") as f:
+                f.seek(0)
+                content = f.read()
+                first_seq, records = self._parse_journal(content)
+                f.write((b"" if content else b"0\n") + token + b"\n")
+            self.writes += 1
+        return first_seq + len(records)
+
+    def _journal_start(self) -> int:
+        """Return the sequence number of the oldest record not yet committed."""
+        try:
+            with open(self.journal_path, "rb") as f:
+                header = f.readline()
+        except FileNotFoundError:
+            return 0
+        return self._parse_journal(header)[0]
+
+    def _read_journal(self) -> tuple:
+        """Return (sequence number of the first record, list of records)."""
+        try:
+            with open(self.journal_path, "rb") as f:
+                return self._parse_journal(f.read())
+        except FileNotFoundError:
+            return 0, []
+
+    def _parse_journal(self, content: bytes) -> tuple:
+        lines = content.split(b"\n")[:-1]   # drops the text after the last newline
+        if not lines:
+            return 0, []
+        try:
+            return int(lines[0]), lines[1:]
+        except ValueError:
+            raise VaultCorruptedError(self.journal_path, "bad journal header") from None
+
+    def _trim_journal(self, applied: int):
+        """Remove the first `applied` records, keeping any appended since the commit read them."""
+        with self._journal_lock:
+            first_seq, records = self._read_journal()
+            remaining = b"".join(record + b"\n" for record in records[applied:])
+            self._write_file(self.journal_path, b"%d\n" % (first_seq + applied) + remaining,
+                             durable=False)   # unsaved records belong to writers still waiting
+
+    # ---- Committing ----
+
+    def _commit(self):
+        """Apply every journaled change set to the vault. Called with the commit lock held."""
+        with self._journal_lock:
+            _, records = self._read_journal()
+        data = dict(self._read(cached=False)[0])   # fresh from disk
+        for token in records:
+            try:
+                record = json.loads(self.cipher.decrypt(token))
+            except (InvalidToken, ValueError):
+                raise VaultCorruptedError(self.journal_path, "cannot read a journal record") from None
+            data.update(record["put"])   # entries are replaced, never changed in place
+            for name in record["delete"]:
+                data.pop(name, None)
+        text = json.dumps(data).encode()
+        encrypted = self.cipher.encrypt(text)
+        self._write_file(self.path, encrypted, self.durable)
+        with self._cache_lock:
+            self._cache = (encrypted, data, text)
+        self._trim_journal(len(records))
+        self.commits += 1
+
+    def _write_file(self, path: str, content: bytes, durable: bool):
+        """Write to a temp file, (optionally) fsync it and rename it over `path`."""
+        folder = os.path.dirname(path)
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".vault_")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        if durable and os.name == "posix":
+            dir_fd = os.open(folder, os.O_RDONLY)   # make the rename itself survive a crash
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def _replace(self, tmp_path: str, path: str):
+        for attempt in range(REPLACE_RETRIES):
+            try:
+                os.replace(tmp_path, path)
+                return
+            except PermissionError:
+                if attempt == REPLACE_RETRIES - 1:
+                    raise
+                time.sleep(REPLACE_RETRY_DELAY)
+
+
+# ------------------- Stress Test -------------------
+
+def _stress_writer(path: str, key: bytes, worker: int, writes: int, threads: int):
+    """One writer process: `threads` threads each save their own share of entries."""
+    store = VaultStore(path, Fernet(key))
+
+    def write_entries(thread: int):
+        for i in range(thread, writes, threads):
+            store.put(f"w{worker}-{i}", {"type": "note", "content": f"entry {i} from writer {worker}"})
+
+    pool = [threading.Thread(target=write_entries, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return store.writes, store.commits
+
+
+def stress_test(processes: int = 8, writes: int = 200, threads: int = 1) -> dict:
+    """
+    Start several writer processes that all save to one vault, then check that
+    every single entry made it (no lost updates) and report the throughput.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    folder = tempfile.mkdtemp(prefix="vault_stress_")
+    path = os.path.join(folder, "secure_data.json")
+    key = Fernet.generate_key()
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(processes) as pool:
+        results = list(pool.map(_stress_writer, [path] * processes, [key] * processes,
+                                range(processes), [writes] * processes, [threads] * processes))
+    elapsed = time.perf_counter() - start
+
+    data = VaultStore(path, Fernet(key)).snapshot()
+    expected = {f"w{w}-{i}" for w in range(processes) for i in range(writes)}
+    lost = len(expected - data.keys())
+
+    for name in os.listdir(folder):
+        os.remove(os.path.join(folder, name))
+    os.rmdir(folder)
+    total_writes = sum(w for w, _ in results)
+    total_commits = sum(c for _, c in results)
+    return {"writes": total_writes, "commits": total_commits, "lost": lost,
+            "seconds": elapsed, "writes_per_second": total_writes / elapsed}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--stress":
+        procs = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+        threads = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+        report = stress_test(procs, threads=threads)
+        print(f"{procs} processes x {threads} thread(s) saved {report['writes']} entries "
+              f"in {report['seconds']:.2f} s ({report['writes_per_second']:.0f} writes/s)")
+        print(f"Commits (fsyncs): {report['commits']} "
+              f"- {report['writes'] / report['commits']:.1f} writes per commit")
+        print(f"Lost updates: {report['lost']}")
+    else:
+        print("Usage: python vault_store.py --stress [PROCESSES] [THREADS]")
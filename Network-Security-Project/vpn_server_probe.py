@@ -0,0 +1,221 @@
+"""
+This program measures how fast each VPN server answers so the best one can be picked automatically.
+Every server is probed at the same time with asyncio by timing TCP connections. The results are
+smoothed with an EWMA, and jitter and packet loss are added as penalties to give each server a score.
+A background loop can keep re-probing so the scores stay up to date.
+"""
+
+import sys
+import time
+import random
+import asyncio
+import threading
+
+
+# ------------------- SETTINGS -------------------
+
+PROBE_PORT = 443          # port used when a server is given as a bare IP
+PROBE_TIMEOUT = 1.0       # seconds before a probe counts as lost
+SAMPLES = 3               # connections per server in each probe round
+SAMPLE_SPACING = 0.02     # seconds between the samples of one round
+EWMA_ALPHA = 0.3          # weight of the newest round in the moving average
+JITTER_WEIGHT = 2.0       # each ms of jitter counts as this many ms of latency
+LOSS_PENALTY_MS = 1000    # score added for 100% packet loss
+REFRESH_INTERVAL = 30     # seconds between background probe rounds
+
+
+# ------------------- Probing -------------------
+
+async def tcp_connect_time(host: str, port: int, timeout: float = PROBE_TIMEOUT,
+                           connect=asyncio.open_connection):
+    """Time one TCP connection in milliseconds. Returns None if it fails or times out."""
+    start = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(connect(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    elapsed = (time.perf_counter() - start) * 1000
+
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return elapsed
+
+
+class ServerScore:
+    """Keeps the smoothed latency, jitter and loss of one server."""
+
+    def __init__(self, name: str, host: str, port: int = PROBE_PORT):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.latency = None   # EWMA of the average connect time (ms)
+        self.jitter = 0.0     # EWMA of the spread between samples (ms)
+        self.loss = 0.0       # EWMA of the fraction of failed samples
+        self.rounds = 0
+
+    def update(self, samples: list):
+        """Fold one probe round (connect times in ms, None for lost) into the averages."""
+        answered = [s for s in samples if s is not None]
+        loss = 1 - len(answered) / len(samples) if samples else 1.0
+
+        if answered:
+            average = sum(answered) / len(answered)
+            spread = sum(abs(s - average) for s in answered) / len(answered)
+        if self.rounds == 0:
+            self.loss = loss
+            if answered:
+                self.latency, self.jitter = average, spread
+        else:
+            self.loss = EWMA_ALPHA * loss + (1 - EWMA_ALPHA) * self.loss
+            if answered and self.latency is None:
+                self.latency, self.jitter = average, spread
+            elif answered:
+                self.latency = EWMA_ALPHA * average + (1 - EWMA_ALPHA) * self.latency
+                self.jitter = EWMA_ALPHA * spread + (1 - EWMA_ALPHA) * self.jitter
+        self.rounds += 1
+
+    @property
+    def score(self) -> float:
+        """Lower is better. Servers that never answered score infinity."""
+        if self.latency is None:
+            return float("inf")
+        return self.latency + JITTER_WEIGHT * self.jitter + LOSS_PENALTY_MS * self.loss
+
+
+# ------------------- Server Selector -------------------
+
+class ServerSelector:
+    """
+    Probes a set of servers and picks the one with the lowest score.
+    `servers` maps a name to an IP/hostname or to a (host, port) pair.
+    """
+
+    def __init__(self, servers: dict, timeout: float = PROBE_TIMEOUT, samples: int = SAMPLES,
+                 connect=asyncio.open_connection):
+        self.timeout = timeout
+        self.samples = samples
+        self.connect = connect
+        self.scores = {}
+        for name, endpoint in servers.items():
+            host, port = endpoint if isinstance(endpoint, tuple) else (endpoint, PROBE_PORT)
+            self.scores[name] = ServerScore(name, host, port)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    async def _probe_server(self, server: ServerScore) -> list:
+        """Run one round of staggered samples against a single server."""
+        async def sample(i):
+            await asyncio.sleep(i * SAMPLE_SPACING)
+            return await tcp_connect_time(server.host, server.port, self.timeout, self.connect)
+        return await asyncio.gather(*(sample(i) for i in range(self.samples)))
+
+    async def probe_all(self):
+        """Probe every server at once and update their scores."""
+        servers = list(self.scores.values())
+        results = await asyncio.gather(*(self._probe_server(s) for s in servers))
+        with self._lock:
+            for server, samples in zip(servers, results):
+                server.update(samples)
+
+    def probe(self):
+        """Run one probe round from normal (non-async) code."""
+        asyncio.run(self.probe_all())
+
+    def ranking(self) -> list:
+        """Return the servers sorted from best to worst."""
+        with self._lock:
+            return sorted(self.scores.values(), key=lambda s: s.score)
+
+    def best(self):
+        """Return the best reachable server, or None if none answered."""
+        ranked = self.ranking()
+        if not ranked or ranked[0].score == float("inf"):
+            return None
+        return ranked[0]
+
+    # ---- Background refresh ----
+
+    async def refresh_loop(self, interval: float = REFRESH_INTERVAL):
+        """Keep re-probing every `interval` seconds until stop() is called."""
+        while not self._stop.is_set():
+            await self.probe_all()
+            await asyncio.get_running_loop().run_in_executor(None, self._stop.wait, interval)
+
+    def start_background_refresh(self, interval: float = REFRESH_INTERVAL):
+        """Start re-probing in a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=asyncio.run, args=(self.refresh_loop(interval),),
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh loop."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+
+# ------------------- Benchmark -------------------
+
+def benchmark_probe(endpoint_count: int = 1000, timeout: float = PROBE_TIMEOUT, seed: int = 1) -> dict:
+    """
+    Probe many stand-in servers on a local listener and time the whole round.
+    Each endpoint gets an injected delay before connecting, and about 5% of them
+    are slower than the timeout so they count as lost.
+    """
+    rng = random.Random(seed)
+    delays = {}
+    for i in range(endpoint_count):
+        slow = rng.random() < 0.05
+        delays[f"server{i}"] = timeout * 2 if slow else rng.uniform(0.005, timeout / 2)
+
+    async def run():
+        server = await asyncio.start_server(lambda r, w: w.close(), "127.0.0.1", 0,
+                                            backlog=endpoint_count * SAMPLES)
+        port = server.sockets[0].getsockname()[1]
+
+        # Each stand-in "host" name is really the local listener behind its delay
+        async def delayed_connect(host, port):
+            await asyncio.sleep(delays[host])
+            return await asyncio.open_connection("127.0.0.1", port)
+
+        selector = ServerSelector({name: (name, port) for name in delays},
+                                  timeout=timeout, connect=delayed_connect)
+        start = time.perf_counter()
+        await selector.probe_all()
+        elapsed = time.perf_counter() - start
+        server.close()
+        await server.wait_closed()
+        return selector, elapsed
+
+    selector, elapsed = asyncio.run(run())
+    best = selector.best()
+    return {
+        "endpoints": endpoint_count,
+        "seconds": elapsed,
+        "timeout": timeout,
+        "best": best.name,
+        "best_delay_ms": delays[best.name] * 1000,
+        "unreachable": sum(1 for s in selector.scores.values() if s.score == float("inf")),
+    }
+
+
+# ------------------- Main -------------------
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+        report = benchmark_probe(count)
+        print(f"Probed {report['endpoints']} endpoints in {report['seconds']:.2f} s "
+              f"(timeout {report['timeout']:.1f} s)")
+        print(f"Best: {report['best']} (injected delay {report['best_delay_ms']:.1f} ms)")
+        print(f"Unreachable: {report['unreachable']}")
+    else:
+        print("Usage: python vpn_server_probe.py --benchmark [ENDPOINT_COUNT]")
@@ -0,0 +1,722 @@
+"""
+This program runs a real (local) VPN-style tunnel instead of just printing a fake IP.
+Applications connect to a SOCKS5 proxy, and their traffic is sent over one encrypted,
+multiplexed connection to an exit relay that opens the real connections.
+The relay loops reuse preallocated buffers (recv_into + memoryview) so no new buffer
+is allocated per packet, apart from the ciphertext the AES-GCM library returns.
+"""
+
+import os
+import sys
+import time
+import struct
+import socket
+import threading
+from collections import deque
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+
+# ------------------- SETTINGS -------------------
+
+SOCKS_ADDRESS = ("127.0.0.1", 1080)    # where applications connect
+RELAY_ADDRESS = ("127.0.0.1", 1081)    # where the exit relay listens
+CHUNK_SIZE = 64 * 1024                 # largest payload carried by one frame
+OPEN_TIMEOUT = 10.0                    # seconds to wait for the exit relay to connect
+
+MAGIC = b"NSVT"                        # first bytes of a new tunnel connection
+SALT_SIZE = 16
+TAG_SIZE = 16                          # AES-GCM authentication tag
+
+# Frame types
+OPEN, OPEN_OK, OPEN_FAIL, DATA, CLOSE, WINDOW, RESET = range(7)
+
+# Bytes one side may send on a stream before the other side confirms it has written
+# them out (WINDOW frames), so a slow application only holds up its own stream
+STREAM_WINDOW = 1024 * 1024
+
+# Each frame on the wire: ciphertext length, stream id, frame type, then ciphertext.
+# The stream id and type are not secret but are authenticated as associated data.
+FRAME_HEADER = struct.Struct("!IIB")
+
+
+# ------------------- Encryption -------------------
+
+def derive_session_key(key: bytes, client_salt: bytes, relay_salt: bytes) -> bytes:
+    """
+    Derive a fresh key for one tunnel session so nonces never repeat across sessions.
+    Both sides contribute a random salt: a replayed client hello meets a new relay salt,
+    so the relay never reuses a (key, nonce) pair from an earlier session.
+    """
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=client_salt + relay_salt,
+                info=b"vpn-tunnel").derive(key)
+
+
+def generate_key() -> bytes:
+    """Create a new random pre-shared tunnel key."""
+    return AESGCM.generate_key(bit_length=256)
+
+
+def recv_exact(sock: socket.socket, view: memoryview) -> bool:
+    """Fill the whole view from the socket. Returns False if the peer closed first."""
+    while view:
+        n = sock.recv_into(view)
+        if n == 0:
+            return False
+        view = view[n:]
+    return True
+
+
+# ------------------- Tunnel Connection -------------------
+
+_END = object()   # queued after a stream's last payload when the other side closes it
+
+
+class Stream:
+    """One connection inside the tunnel: its local socket, queued incoming data and send credit."""
+
+    def __init__(self, stream_id: int):
+        self.id = stream_id
+        self.sock = None                # attached once the local side is ready for data
+        self.inbox = deque()            # decrypted payloads waiting to be written to sock
+        self.queued = 0                 # bytes currently in inbox
+        self.credit = STREAM_WINDOW     # bytes we may still send before the other side confirms
+        self.reset = False              # aborted in both directions
+        self.done = set()               # finished directions: "local" and/or "remote"
+        self.cond = threading.Condition()
+
+
+class TunnelConnection:
+    """
+    One encrypted connection carrying many streams.
+    Each side counts the frames it sends and uses the count as the AES-GCM nonce,
+    so the frames must be sent in nonce order (done under a lock).
+    The read loop never blocks on a local socket: it queues data on the stream,
+    and each stream has its own thread writing that data out.
+    """
+
+    def __init__(self, sock: socket.socket, session_key: bytes, is_client: bool, on_open=None):
+        self.sock = sock
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.aead = AESGCM(session_key)
+        self.send_prefix = b"\x00\x00\x00\x01" if is_client else b"\x00\x00\x00\x02"
+        self.recv_prefix = b"\x00\x00\x00\x02" if is_client else b"\x00\x00\x00\x01"
+        self.send_counter = 0
+        self.recv_counter = 0
+        self.on_open = on_open    # called as on_open(stream_id, target bytes) on the exit side
+        self.streams = {}         # stream id -> Stream
+        self.waiting = {}         # stream id -> [Event, opened?] while an OPEN is pending
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._header = bytearray(FRAME_HEADER.size)   # reused for every outgoing frame
+        self.alive = True
+
+    # ---- Sending ----
+
+    def send_frame(self, stream_id: int, frame_type: int, payload=b""):
+        """Encrypt and send one frame. `payload` may be a memoryview into a reused buffer."""
+        with self._send_lock:
+            nonce = self.send_prefix + self.send_counter.to_bytes(8, "big")
+            self.send_counter += 1
+            FRAME_HEADER.pack_into(self._header, 0, len(payload) + TAG_SIZE, stream_id, frame_type)
+            ciphertext = self.aead.encrypt(nonce, payload, self._header)
+            # Scatter-gather send: header and ciphertext go out without being joined
+            sent = self.sock.sendmsg([self._header, ciphertext])
+            if sent < len(self._header) + len(ciphertext):
+                self.sock.sendall(memoryview(self._header + ciphertext)[sent:])
+
+    # ---- Receiving ----
+
+    def read_loop(self):
+        """Read frames until the tunnel closes and hand them to the right stream."""
+        header_buf = bytearray(FRAME_HEADER.size)
+        frame_buf = bytearray(CHUNK_SIZE + TAG_SIZE)
+        header_view = memoryview(header_buf)
+        frame_view = memoryview(frame_buf)
+        try:
+            while recv_exact(self.sock, header_view):
+                length, stream_id, frame_type = FRAME_HEADER.unpack_from(header_buf)
+                if length > len(frame_buf) or not recv_exact(self.sock, frame_view[:length]):
+                    break
+                nonce = self.recv_prefix + self.recv_counter.to_bytes(8, "big")
+                self.recv_counter += 1
+                payload = self.aead.decrypt(nonce, frame_view[:length], header_buf)
+                self._dispatch(stream_id, frame_type, payload)
+        except (OSError, InvalidTag):
+            pass   # broken or tampered tunnel (or a peer ignoring the window): drop everything
+        finally:
+            self.close()
+
+    def _dispatch(self, stream_id: int, frame_type: int, payload: bytes):
+        if frame_type in (OPEN_OK, OPEN_FAIL):
+            with self._lock:
+                waiter = self.waiting.pop(stream_id, None)
+            if waiter:
+                waiter[1] = frame_type == OPEN_OK
+                waiter[0].set()
+            elif frame_type == OPEN_OK:
+                self.send_frame(stream_id, RESET)   # we gave up waiting; don't leave it open
+            return
+        if frame_type == OPEN:
+            if self.on_open:
+                self.on_open(stream_id, payload)
+            return
+        if frame_type == RESET:
+            self.reset_stream(stream_id, notify_peer=False)
+            return
+
+        stream = self.streams.get(stream_id)
+        if stream is None:
+            return   # already finished; frames that were in flight are dropped
+        with stream.cond:
+            if frame_type == DATA:
+                stream.queued += len(payload)
+                if stream.queued > STREAM_WINDOW:
+                    raise ConnectionError("peer sent more than the stream window")
+                stream.inbox.append(payload)
+            elif frame_type == CLOSE:
+                stream.inbox.append(_END)
+            elif frame_type == WINDOW:
+                stream.credit += int.from_bytes(payload, "big")
+            stream.cond.notify_all()
+
+    # ---- Streams ----
+
+    def open_stream(self, stream_id: int, target: str, timeout: float = OPEN_TIMEOUT) -> bool:
+        """
+        Ask the other side to connect to `target` ("host:port"). Returns True on success.
+        Data that arrives before run_stream() is called waits in the stream's queue.
+        """
+        waiter = [threading.Event(), False]
+        with self._lock:
+            self.waiting[stream_id] = waiter
+            self.streams[stream_id] = Stream(stream_id)
+        self.send_frame(stream_id, OPEN, target.encode())
+        if not waiter[0].wait(timeout) or not waiter[1]:
+            with self._lock:
+                self.waiting.pop(stream_id, None)
+                self.streams.pop(stream_id, None)
+            return False
+        return True
+
+    def add_stream(self, stream_id: int):
+        """Register a stream that was opened by the other side."""
+        with self._lock:
+            self.streams[stream_id] = Stream(stream_id)
+
+    def run_stream(self, stream_id: int, sock: socket.socket):
+        """Attach the local socket to a stream and relay it until both directions finish."""
+        stream = self.streams.get(stream_id)
+        if stream is None:
+            sock.close()
+            return
+        stream.sock = sock
+        threading.Thread(target=self._deliver, args=(stream,), daemon=True).start()
+        self._pump(stream)
+
+    def _pump(self, stream: Stream):
+        """Copy data from the local socket into the tunnel with one reused buffer."""
+        sock = stream.sock
+        buf = bytearray(CHUNK_SIZE)
+        view = memoryview(buf)
+        try:
+            while True:
+                with stream.cond:
+                    while stream.credit <= 0 and not stream.reset and self.alive:
+                        stream.cond.wait()
+                    if stream.reset or not self.alive:
+                        break
+                    limit = min(CHUNK_SIZE, stream.credit)
+                n = sock.recv_into(buf, limit)
+                if n == 0:
+                    break
+                with stream.cond:
+                    stream.credit -= n
+                self.send_frame(stream.id, DATA, view[:n])
+        except OSError:
+            pass
+        if stream.reset or not self.alive:
+            try:
+                sock.close()
+            except OSError:
+                pass
+            return
+        try:
+            self.send_frame(stream.id, CLOSE)
+        except OSError:
+            pass
+        self.finish(stream.id, "local")
+
+    def _deliver(self, stream: Stream):
+        """Write a stream's queued data to its socket, giving the sender credit as it goes."""
+        sock = stream.sock
+        written = 0
+        while True:
+            with stream.cond:
+                while not stream.inbox and not stream.reset and self.alive:
+                    stream.cond.wait()
+                if stream.reset or not self.alive:
+                    return
+                payload = stream.inbox.popleft()
+                if payload is not _END:
+                    stream.queued -= len(payload)
+            if payload is _END:
+                self.finish(stream.id, "remote")
+                return
+            try:
+                sock.sendall(payload)
+                written += len(payload)
+                # Confirming in halves of the window keeps the sender from ever running dry
+                if written >= STREAM_WINDOW // 2:
+                    self.send_frame(stream.id, WINDOW, written.to_bytes(4, "big"))
+                    written = 0
+            except OSError:
+                self.reset_stream(stream.id)
+                return
+
+    def finish(self, stream_id: int, side: str):
+        """Mark one direction of a stream as done. The socket closes when both are."""
+        with self._lock:
+            stream = self.streams.get(stream_id)
+            if stream is None:
+                return
+            stream.done.add(side)
+            both = len(stream.done) == 2
+            if both:
+                del self.streams[stream_id]
+        try:
+            if both:
+                stream.sock.close()
+            elif side == "remote":
+                stream.sock.shutdown(socket.SHUT_WR)   # pass the end-of-data on to the application
+        except OSError:
+            pass
+
+    def reset_stream(self, stream_id: int, notify_peer: bool = True):
+        """Abort a stream in both directions and (by default) tell the other side to do the same."""
+        with self._lock:
+            stream = self.streams.pop(stream_id, None)
+        if stream is None:
+            return
+        if notify_peer:
+            try:
+                self.send_frame(stream_id, RESET)
+            except OSError:
+                pass
+        with stream.cond:
+            stream.reset = True
+            stream.cond.notify_all()
+        if stream.sock is not None:
+            try:
+                stream.sock.shutdown(socket.SHUT_RDWR)   # wakes the pump; it closes the socket
+            except OSError:
+                pass
+
+    def close(self):
+        """Close the tunnel and every stream still using it."""
+        self.alive = False
+        with self._lock:
+            streams = list(self.streams.values())
+            self.streams.clear()
+            waiters = list(self.waiting.values())
+            self.waiting.clear()
+        for waiter in waiters:
+            waiter[0].set()
+        for stream in streams:
+            with stream.cond:
+                stream.cond.notify_all()
+        for sock in [stream.sock for stream in streams if stream.sock] + [self.sock]:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)   # wakes any thread blocked reading it
+                sock.close()
+            except OSError:
+                pass
+
+
+# ------------------- Exit Relay -------------------
+
+class ExitRelay:
+    """The far end of the tunnel: decrypts streams and opens the real connections."""
+
+    def __init__(self, key: bytes, address=RELAY_ADDRESS):
+        self.key = key
+        self.listener = socket.create_server(address)
+        self.address = self.listener.getsockname()
+
+    def serve_forever(self):
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle_tunnel, args=(sock,), daemon=True).start()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def _handle_tunnel(self, sock: socket.socket):
+        hello = bytearray(len(MAGIC) + SALT_SIZE)
+        if not recv_exact(sock, memoryview(hello)) or hello[:len(MAGIC)] != MAGIC:
+            sock.close()
+            return
+        relay_salt = os.urandom(SALT_SIZE)
+        try:
+            sock.sendall(MAGIC + relay_salt)
+        except OSError:
+            sock.close()
+            return
+        session_key = derive_session_key(self.key, bytes(hello[len(MAGIC):]), relay_salt)
+        tunnel = TunnelConnection(sock, session_key, is_client=False)
+        tunnel.on_open = lambda stream_id, target: threading.Thread(
+            target=self._open_target, args=(tunnel, stream_id, target), daemon=True).start()
+        tunnel.read_loop()
+
+    def _open_target(self, tunnel: TunnelConnection, stream_id: int, target: bytes):
+        try:
+            host, _, port = target.decode().rpartition(":")
+            sock = socket.create_connection((host.strip("[]"), int(port)), timeout=OPEN_TIMEOUT)
+            sock.settimeout(None)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except (OSError, ValueError):
+            try:
+                tunnel.send_frame(stream_id, OPEN_FAIL)
+            except OSError:
+                pass
+            return
+        tunnel.add_stream(stream_id)   # registered first, so data sent after OPEN_OK has a home
+        try:
+            tunnel.send_frame(stream_id, OPEN_OK)
+        except OSError:
+            sock.close()
+            return
+        tunnel.run_stream(stream_id, sock)
+
+    def close(self):
+        self.listener.close()
+
+
+# ------------------- SOCKS5 Front End -------------------
+
+class Socks5Server:
+    """
+    A local SOCKS5 proxy (no authentication, CONNECT only) that sends every
+    connection through one encrypted tunnel to the exit relay.
+    If the tunnel is lost (relay restart, network error, tampering), the next
+    client to arrive opens a new one.
+    """
+
+    def __init__(self, key: bytes, relay_address=RELAY_ADDRESS, address=SOCKS_ADDRESS):
+        self.key = key
+        self.relay_address = relay_address
+        self.closed = False
+        self._tunnel_lock = threading.Lock()
+        self.tunnel = self._connect_tunnel()
+        self.listener = socket.create_server(address)
+        self.address = self.listener.getsockname()
+        self._next_id = 1
+        self._id_lock = threading.Lock()
+
+    def _connect_tunnel(self) -> TunnelConnection:
+        """Connect to the exit relay, agree on a session key and start reading frames."""
+        client_salt = os.urandom(SALT_SIZE)
+        sock = socket.create_connection(self.relay_address, timeout=OPEN_TIMEOUT)
+        try:
+            sock.sendall(MAGIC + client_salt)
+            reply = bytearray(len(MAGIC) + SALT_SIZE)
+            if not recv_exact(sock, memoryview(reply)) or reply[:len(MAGIC)] != MAGIC:
+                raise ConnectionError("exit relay did not complete the tunnel handshake")
+            sock.settimeout(None)
+        except OSError:
+            sock.close()
+            raise
+        session_key = derive_session_key(self.key, client_salt, bytes(reply[len(MAGIC):]))
+        tunnel = TunnelConnection(sock, session_key, is_client=True)
+        threading.Thread(target=tunnel.read_loop, daemon=True).start()
+        return tunnel
+
+    def _get_tunnel(self):
+        """Return a live tunnel, reconnecting first if the last one died (None if that fails)."""
+        with self._tunnel_lock:   # only one thread reconnects; the others wait and reuse it
+            if not self.tunnel.alive and not self.closed:
+                try:
+                    self.tunnel = self._connect_tunnel()
+                except OSError:
+                    return None
+            return self.tunnel if self.tunnel.alive else None
+
+    def serve_forever(self):
+        while True:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle_client, args=(client,), daemon=True).start()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def _read_target(self, client: socket.socket):
+        """Do the SOCKS5 greeting and return the requested "host:port" (or None)."""
+        buf = bytearray(262)
+        view = memoryview(buf)
+        if not recv_exact(client, view[:2]) or buf[0] != 5:
+            return None
+        if not recv_exact(client, view[:buf[1]]):
+            return None
+        client.sendall(b"\x05\x00")   # version 5, no authentication
+
+        if not recv_exact(client, view[:4]):
+            return None
+        if buf[1] != 1:   # only CONNECT is supported
+            client.sendall(b"\x05\x07\x00\x01" + bytes(6))
+            return None
+        address_type = buf[3]
+        if address_type == 1:
+            size = 4
+        elif address_type == 4:
+            size = 16
+        elif address_type == 3:
+            if not recv_exact(client, view[:1]):
+                return None
+            size = buf[0]
+        else:
+            client.sendall(b"\x05\x08\x00\x01" + bytes(6))
+            return None
+        if not recv_exact(client, view[:size + 2]):   # address, then the 2-byte port
+            return None
+        raw = bytes(view[:size])
+        port = struct.unpack_from("!H", buf, size)[0]
+        if address_type == 1:
+            host = socket.inet_ntop(socket.AF_INET, raw)
+        elif address_type == 4:
+            host = "[" + socket.inet_ntop(socket.AF_INET6, raw) + "]"
+        else:
+            try:
+                host = raw.decode("ascii")
+            except UnicodeDecodeError:
+                client.sendall(b"\x05\x04\x00\x01" + bytes(6))   # host unreachable
+                return None
+        return f"{host}:{port}"
+
+    def _handle_client(self, client: socket.socket):
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            target = self._read_target(client)
+        except OSError:
+            target = None
+        if target is None:
+            client.close()
+            return
+        tunnel = self._get_tunnel()
+        if tunnel is None:
+            try:
+                client.sendall(b"\x05\x01\x00\x01" + bytes(6))   # general failure: no tunnel
+            except OSError:
+                pass
+            client.close()
+            return
+
+        with self._id_lock:
+            stream_id = self._next_id
+            self._next_id += 1
+
+        try:
+            opened = tunnel.open_stream(stream_id, target)
+        except OSError:
+            opened = False
+        try:
+            if not opened:
+                client.sendall(b"\x05\x05\x00\x01" + bytes(6))   # connection refused
+                client.close()
+                return
+            client.sendall(b"\x05\x00\x00\x01" + bytes(6))   # success
+        except OSError:
+            tunnel.reset_stream(stream_id)
+            client.close()
+            return
+        # Only now can data from the target reach the client, after the SOCKS reply
+        tunnel.run_stream(stream_id, client)
+
+    def close(self):
+        self.listener.close()
+        with self._tunnel_lock:
+            self.closed = True
+            self.tunnel.close()
+
+
+def socks5_connect(proxy_address, host: str, port: int) -> socket.socket:
+    """Open a connection to host:port through a SOCKS5 proxy (for clients and tests)."""
+    sock = socket.create_connection(proxy_address)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    name = host.encode()
+    sock.sendall(b"\x05\x01\x00" + b"\x05\x01\x00\x03" + bytes([len(name)]) + name
+                 + struct.pack("!H", port))
+    reply = bytearray(12)
+    # Greeting reply (2 bytes) then CONNECT reply (10 bytes); byte 3 is the status
+    if not recv_exact(sock, memoryview(reply)) or reply[1] != 0 or reply[3] != 0:
+        sock.close()
+        raise ConnectionError("SOCKS5 proxy could not open the connection")
+    return sock
+
+
+# ------------------- Plain Relay (Benchmark Baseline) -------------------
+
+def relay(src: socket.socket, dst: socket.socket):
+    """Copy src to dst with one reused buffer, then pass on the end-of-data."""
+    buf = bytearray(CHUNK_SIZE)
+    view = memoryview(buf)
+    try:
+        while True:
+            n = src.recv_into(buf)
+            if n == 0:
+                break
+            dst.sendall(view[:n])
+        dst.shutdown(socket.SHUT_WR)
+    except OSError:
+        pass
+
+
+class PlainRelay:
+    """An unencrypted TCP forwarder to one target, used as the benchmark baseline."""
+
+    def __init__(self, target, address=("127.0.0.1", 0)):
+        self.target = target
+        self.listener = socket.create_server(address)
+        self.address = self.listener.getsockname()
+
+    def serve_forever(self):
+        while True:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(client,), daemon=True).start()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def _handle(self, client: socket.socket):
+        try:
+            upstream = socket.create_connection(self.target)
+        except OSError:
+            client.close()
+            return
+        for sock in (client, upstream):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        back = threading.Thread(target=relay, args=(upstream, client), daemon=True)
+        back.start()
+        relay(client, upstream)
+        back.join()
+        client.close()
+        upstream.close()
+
+    def close(self):
+        self.listener.close()
+
+
+# ------------------- Benchmark -------------------
+
+def _start_test_server(mode: str):
+    """Start a local server that either echoes or swallows everything it gets."""
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def handle(conn):
+        buf = bytearray(CHUNK_SIZE)
+        view = memoryview(buf)
+        with conn:
+            while True:
+                n = conn.recv_into(buf)
+                if n == 0:
+                    return
+                if mode == "echo":
+                    conn.sendall(view[:n])
+
+    def serve():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener
+
+
+def benchmark_tunnel(megabytes: int = 200, connections: int = 200) -> dict:
+    """
+    Compare the encrypted SOCKS5 tunnel with a plain relay on loopback.
+    Reports throughput in MB/s and the average time to open a connection
+    and get one byte echoed back.
+    """
+    sink = _start_test_server("sink")
+    echo = _start_test_server("echo")
+    key = generate_key()
+    exit_relay = ExitRelay(key, ("127.0.0.1", 0)).start()
+    proxy = Socks5Server(key, exit_relay.address, ("127.0.0.1", 0)).start()
+    plain_sink = PlainRelay(sink.getsockname()).start()
+    plain_echo = PlainRelay(echo.getsockname()).start()
+
+    paths = {
+        "plain": (lambda: socket.create_connection(plain_sink.address),
+                  lambda: socket.create_connection(plain_echo.address)),
+        "tunnel": (lambda: socks5_connect(proxy.address, "127.0.0.1", sink.getsockname()[1]),
+                   lambda: socks5_connect(proxy.address, "127.0.0.1", echo.getsockname()[1])),
+    }
+    block = memoryview(bytearray(CHUNK_SIZE))
+    blocks = megabytes * 1024 * 1024 // CHUNK_SIZE
+    results = {}
+
+    for label, (open_sink, open_echo) in paths.items():
+        # Throughput: push the data and wait until the far end has closed
+        start = time.perf_counter()
+        sock = open_sink()
+        for _ in range(blocks):
+            sock.sendall(block)
+        sock.shutdown(socket.SHUT_WR)
+        sock.recv(1)
+        sock.close()
+        elapsed = time.perf_counter() - start
+
+        # Setup latency: connect and get one byte echoed back
+        setup_start = time.perf_counter()
+        for _ in range(connections):
+            conn = open_echo()
+            conn.sendall(b"x")
+            conn.recv(1)
+            conn.close()
+        setup = (time.perf_counter() - setup_start) / connections
+
+        results[label] = {"mb_per_s": blocks * CHUNK_SIZE / elapsed / 1024 / 1024,
+                          "setup_ms": setup * 1000}
+
+    for server in (proxy, exit_relay, plain_sink, plain_echo, sink, echo):
+        server.close()
+    return results
+
+
+# ------------------- Main -------------------
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        report = benchmark_tunnel()
+        for label, stats in report.items():
+            print(f"{label:>6}: {stats['mb_per_s']:.1f} MB/s, "
+                  f"connection setup {stats['setup_ms']:.2f} ms")
+    else:
+        tunnel_key = generate_key()
+        ExitRelay(tunnel_key).start()
+        socks = Socks5Server(tunnel_key)
+        print(f"Encrypted tunnel running. Set your SOCKS5 proxy to "
+              f"{socks.address[0]}:{socks.address[1]} (Ctrl+C to stop).")
+        try:
+            socks.serve_forever()
+        except KeyboardInterrupt:
+            socks.close()
+            print("\nTunnel closed.")